@@ -5,16 +5,64 @@ Backup Service - Backup lokal ke CSV dan recovery system
 """
 
 import os
+import io
+import re
 import csv
+import gzip
 import json
+import array
+import hashlib
+import mmap
 import time
+import queue
+import atexit
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
+TRANSACTION_HEADERS = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori', 'Saldo', 'Bukti', 'Private']
+
+# Fixed 8-column row template, same line ending as csv.writer
+_TX_FMT = '{0},{1},{2},{3},{4},{5},{6},{7}\r\n'.format
+_CSV_SPECIAL = re.compile(r'[,"\r\n]')
+
+def _csv_field(value: Any) -> str:
+    """Format a single CSV field, quoting only when needed (like csv.QUOTE_MINIMAL)"""
+    text = '' if value is None else str(value)
+    if _CSV_SPECIAL.search(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+def _key_hash(key: str) -> int:
+    """64-bit hash of a sync dedup key (deskripsi + tanggal)"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _row_key_hash(row) -> int:
+    """Dedup key hash for a CSV row (tanggal, deskripsi, ...)"""
+    return _key_hash(f"{'' if row[1] is None else row[1]}{'' if row[0] is None else row[0]}")
+
+# Column types for pandas; everything except the amounts stays a string
+TRANSACTION_DTYPES = {
+    'Tanggal': str,
+    'Deskripsi': str,
+    'Jumlah': 'int64',
+    'Tipe': str,
+    'Kategori': str,
+    'Saldo': 'int64',
+    'Bukti': str,
+    'Private': str
+}
+
 class BackupService:
     def __init__(self):
         self.backup_dir = "backups"
@@ -29,9 +77,34 @@ class BackupService:
         self.transactions_file = os.path.join(self.backup_dir, "transactions.csv")
         self.config_file = os.path.join(self.backup_dir, "config.json")
         self.last_backup_file = os.path.join(self.backup_dir, "last_backup.json")
+        self.keys_index_file = os.path.join(self.backup_dir, "keys.idx")
+        
+        # Background writer settings
+        self.max_batch_size = 256  # Rows written per batch
+        self._write_q = queue.SimpleQueue()
+        self._lock = threading.Lock()  # Guards the file handle
+        self._state_lock = threading.Lock()  # Guards the cached state
+        self._fh = None
+        self._failed_rows: List[Tuple] = []  # Rows whose write failed, retried with the next batch
+        
+        # In-memory cache of the last row, so reads don't reparse the CSV
+        self._last_balance: Optional[int] = None
+        self._tx_count: int = 0
+        self._last_backup_ts: float = 0.0
+        self._last_full_backup = None  # ((size, mtime), filename)
+        self._key_set = set()  # Hashes of deskripsi + tanggal for sync dedup
         
         # Initialize backup system
         self._initialize_backup_system()
+        self._load_cached_state()
+        self._load_key_index()
+        self._load_last_backup_time()
+        self._open_writer()
+        
+        # Start background writer thread
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
     
     def _initialize_backup_system(self):
         """Initialize backup system"""
@@ -54,11 +127,9 @@ class BackupService:
     def _create_initial_transactions_file(self):
         """Create initial transactions CSV file"""
         try:
-            headers = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori', 'Saldo', 'Bukti', 'Private']
-            
             with open(self.transactions_file, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile)
-                writer.writerow(headers)
+                writer.writerow(TRANSACTION_HEADERS)
             
             print("✅ Initial transactions file created")
             
@@ -77,8 +148,7 @@ class BackupService:
                 }
             }
             
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+            self._dump_json(config, self.config_file)
             
             print("✅ Initial config file created")
             
@@ -88,20 +158,260 @@ class BackupService:
     def _create_initial_last_backup_file(self):
         """Create initial last backup file"""
         try:
+            now = time.time()
             last_backup = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': datetime.fromtimestamp(now).isoformat(),
+                'timestamp_epoch': now,
                 'type': 'initial',
                 'status': 'success'
             }
             
-            with open(self.last_backup_file, 'w', encoding='utf-8') as f:
-                json.dump(last_backup, f, indent=2, ensure_ascii=False)
+            self._dump_json(last_backup, self.last_backup_file)
             
             print("✅ Initial last backup file created")
             
         except Exception as e:
             print(f"❌ Error creating initial last backup file: {str(e)}")
     
+    def _load_cached_state(self):
+        """Load last balance (tail scan) and row count from the transactions file"""
+        try:
+            self._last_balance = None
+            self._tx_count = 0
+            
+            if not os.path.exists(self.transactions_file):
+                return
+            
+            # Count data rows once on cold start
+            self._tx_count = self._count_rows()
+            
+            if not self._tx_count:
+                return
+            
+            # Read only the tail of the file to find the last row
+            rows = self._tail_rows(self.transactions_file, 1)
+            if rows:
+                self._last_balance = int(rows[-1][5] or 0)
+                
+        except Exception as e:
+            print(f"❌ Error loading cached backup state: {str(e)}")
+    
+    def _count_rows(self) -> int:
+        """Count data rows (parsed as CSV: quoted descriptions may contain newlines)"""
+        with open(self.transactions_file, 'r', newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader, None)  # Skip header
+            return sum(1 for row in reader if len(row) >= 2)
+    
+    def _load_key_index(self, rebuild: bool = False):
+        """Load keys.idx into the key set, rebuilding it if it is out of step with the CSV"""
+        try:
+            keys = array.array('Q')
+            if not rebuild and os.path.exists(self.keys_index_file):
+                with open(self.keys_index_file, 'rb') as f:
+                    keys.frombytes(f.read())
+            
+            if rebuild or len(keys) != self._tx_count:
+                keys = self._rebuild_key_index()
+            
+            self._key_set = set(keys)
+            
+        except Exception as e:
+            self._key_set = set()
+            print(f"❌ Error loading key index: {str(e)}")
+    
+    def _rebuild_key_index(self) -> array.array:
+        """Hash every row's dedup key and rewrite keys.idx atomically"""
+        keys = array.array('Q')
+        if os.path.exists(self.transactions_file):
+            with open(self.transactions_file, 'r', newline='', encoding='utf-8') as csvfile:
+                reader = csv.reader(csvfile)
+                next(reader, None)  # Skip header
+                keys.extend(_row_key_hash(row) for row in reader if len(row) >= 2)
+        
+        temp_file = f"{self.keys_index_file}.tmp"
+        with open(temp_file, 'wb') as f:
+            keys.tofile(f)
+        os.replace(temp_file, self.keys_index_file)
+        
+        return keys
+    
+    def _dump_json(self, data: Any, path: str):
+        """Write JSON to file, using orjson when available"""
+        if orjson:
+            with open(path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+    
+    def _load_json(self, path: str) -> Any:
+        """Read JSON from file, using orjson when available"""
+        if orjson:
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _load_last_backup_time(self):
+        """Read the last backup time once so is_backup_needed stays in memory"""
+        try:
+            last_backup = self._load_json(self.last_backup_file)
+            
+            # Prefer the epoch field; older files only have the ISO timestamp
+            if 'timestamp_epoch' in last_backup:
+                self._last_backup_ts = float(last_backup['timestamp_epoch'])
+            else:
+                self._last_backup_ts = datetime.fromisoformat(last_backup['timestamp']).timestamp()
+            
+        except Exception as e:
+            self._last_backup_ts = 0.0
+            print(f"❌ Error loading last backup time: {str(e)}")
+    
+    def _open_writer(self):
+        """Open the transactions file once for buffered appends"""
+        try:
+            self._fh = open(self.transactions_file, 'a', newline='', encoding='utf-8', buffering=1 << 20)
+        except Exception as e:
+            self._fh = None
+            print(f"❌ Error opening transactions file: {str(e)}")
+    
+    def _writer_loop(self):
+        """
+        Drain the write queue and append rows to disk in batches
+        
+        Queue items are lists of rows, a threading.Event to signal once
+        everything queued before it is on disk, or None to stop.
+        """
+        while True:
+            item = self._write_q.get()
+            batch = []
+            waiters = []
+            stop = False
+            
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.extend(item)
+                
+                if stop or len(batch) >= self.max_batch_size:
+                    break
+                try:
+                    item = self._write_q.get_nowait()
+                except queue.Empty:
+                    break
+            
+            if batch or self._failed_rows:
+                self._write_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+    
+    def _write_batch(self, batch: List[Tuple]):
+        """
+        Write a batch of rows and fsync once
+        
+        Rows are already counted in the cached state, so a failed write keeps
+        them in _failed_rows and retries them ahead of the next batch.
+        """
+        with self._lock:
+            batch = self._failed_rows + batch
+            self._failed_rows = []
+            try:
+                if not self._fh:
+                    self._open_writer()
+                    if not self._fh:
+                        raise Exception("Transactions file not open")
+                
+                # One write for the whole batch, no csv module overhead
+                pos = self._fh.tell()
+                try:
+                    self._fh.write(''.join(_TX_FMT(*map(_csv_field, row)) for row in batch))
+                    self._fh.flush()
+                    os.fsync(self._fh.fileno())
+                except Exception:
+                    self._discard_partial_write(pos)
+                    raise
+            except Exception as e:
+                self._failed_rows = batch
+                print(f"❌ Error writing {len(batch)} transaction(s), will retry: {str(e)}")
+                return
+            
+            try:
+                # Extend the key index; it is rebuilt from the CSV if this is lost
+                with open(self.keys_index_file, 'ab') as f:
+                    array.array('Q', map(_row_key_hash, batch)).tofile(f)
+            except Exception as e:
+                print(f"❌ Error updating key index: {str(e)}")
+    
+    def _discard_partial_write(self, pos: int):
+        """Drop the handle and cut the file back to pos so a retry can't duplicate rows"""
+        fh, self._fh = self._fh, None
+        try:
+            fh.close()
+        except Exception:
+            pass
+        try:
+            os.truncate(self.transactions_file, pos)
+        except Exception as e:
+            print(f"❌ Error truncating partial write: {str(e)}")
+    
+    def flush(self, timeout: float = 10) -> bool:
+        """
+        Wait until every queued transaction is written to disk
+        
+        Returns:
+            bool: True if nothing is left unwritten
+        """
+        if self._writer_thread.is_alive():
+            done = threading.Event()
+            self._write_q.put(done)
+            if not done.wait(timeout):
+                return False
+        return not self._failed_rows
+    
+    def close(self):
+        """Drain the write queue and close the transactions file"""
+        if self._writer_thread.is_alive():
+            self._write_q.put(None)
+            self._writer_thread.join()
+        with self._lock:
+            if self._failed_rows:
+                print(f"❌ {len(self._failed_rows)} transaction(s) could not be written to the local backup")
+            if self._fh:
+                try:
+                    self._fh.close()
+                except Exception as e:
+                    print(f"❌ Error closing transactions file: {str(e)}")
+                self._fh = None
+    
+    def _build_row(self, transaction_data: Dict[str, Any]) -> Tuple:
+        """Prepare a CSV row tuple from a transaction dict"""
+        g = transaction_data.get
+        return (
+            g('tanggal', ''),
+            g('deskripsi', ''),
+            g('jumlah', 0),
+            g('tipe', 'INFO'),
+            g('kategori', 'Lainnya'),
+            g('saldo', 0),
+            g('bukti', ''),
+            g('private', 'No')
+        )
+    
+    def _append_rows(self, rows: List[Tuple]):
+        """Queue rows for the writer thread and update the cached state"""
+        with self._state_lock:
+            self._last_balance = int(rows[-1][5] or 0)
+            self._tx_count += len(rows)
+            self._key_set.update(map(_row_key_hash, rows))
+        
+        self._write_q.put(rows)
+    
     def save_transaction(self, transaction_data: Dict[str, Any]) -> bool:
         """
         Save transaction to local CSV backup
@@ -112,25 +422,23 @@ class BackupService:
         Returns:
             bool: True if successful
         """
-        try:
-            # Prepare row data
-            row_data = [
-                transaction_data.get('tanggal', ''),
-                transaction_data.get('deskripsi', ''),
-                transaction_data.get('jumlah', 0),
-                transaction_data.get('tipe', 'INFO'),
-                transaction_data.get('kategori', 'Lainnya'),
-                transaction_data.get('saldo', 0),
-                transaction_data.get('bukti', ''),
-                transaction_data.get('private', 'No')
-            ]
+        return self.save_transaction_tuple(self._build_row(transaction_data))
+    
+    def save_transaction_tuple(self, t: Tuple) -> bool:
+        """
+        Save an already-shaped transaction row to local CSV backup
+        
+        Args:
+            t: (tanggal, deskripsi, jumlah, tipe, kategori, saldo, bukti, private)
             
-            # Append to CSV file
-            with open(self.transactions_file, 'a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(row_data)
+        Returns:
+            bool: True if successful
+        """
+        try:
+            # Hand off to the background writer thread
+            self._append_rows([t])
             
-            print(f"✅ Transaction backed up locally: {transaction_data.get('deskripsi', '')}")
+            print(f"✅ Transaction backed up locally: {t[1]}")
             return True
             
         except Exception as e:
@@ -153,25 +461,28 @@ class BackupService:
             if not os.path.exists(self.transactions_file):
                 return transactions
             
-            with open(self.transactions_file, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
+            # Make sure buffered rows are visible to the reader
+            self.flush()
+            
+            # Only parse the tail of the file when a limit is given
+            if limit:
+                rows = self._tail_rows(self.transactions_file, limit)
+                return [self._row_to_transaction(dict(zip(TRANSACTION_HEADERS, row))) for row in rows]
+            
+            # Parse with pandas' C parser when available
+            df = self._read_frame()
+            if df is not None:
+                return df.rename(columns=str.lower).to_dict(orient='records')
+            
+            if not os.path.getsize(self.transactions_file):
+                return transactions
+            
+            # Let the page cache serve the file directly, decoding one line at a time
+            with open(self.transactions_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                reader = csv.DictReader(line.decode('utf-8') for line in iter(mm.readline, b''))
                 
                 for row in reader:
-                    transaction = {
-                        'tanggal': row.get('Tanggal', ''),
-                        'deskripsi': row.get('Deskripsi', ''),
-                        'jumlah': int(row.get('Jumlah', 0)),
-                        'tipe': row.get('Tipe', 'INFO'),
-                        'kategori': row.get('Kategori', 'Lainnya'),
-                        'saldo': int(row.get('Saldo', 0)),
-                        'bukti': row.get('Bukti', ''),
-                        'private': row.get('Private', 'No')
-                    }
-                    transactions.append(transaction)
-            
-            # Return limited results if specified
-            if limit:
-                return transactions[-limit:]
+                    transactions.append(self._row_to_transaction(row))
             
             return transactions
             
@@ -179,6 +490,76 @@ class BackupService:
             print(f"❌ Error getting transactions from backup: {str(e)}")
             return []
     
+    def _read_frame(self):
+        """
+        Read the transactions CSV into a pandas DataFrame
+        
+        Returns:
+            DataFrame, or None if pandas is not available
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            return None
+        
+        self.flush()
+        return pd.read_csv(self.transactions_file, dtype=TRANSACTION_DTYPES, na_filter=False,
+                           engine='c', memory_map=True)
+    
+    def _row_to_transaction(self, row: Dict[str, str]) -> Dict[str, Any]:
+        """Convert a CSV row into a transaction dict"""
+        return {
+            'tanggal': row.get('Tanggal', ''),
+            'deskripsi': row.get('Deskripsi', ''),
+            'jumlah': int(row.get('Jumlah', 0)),
+            'tipe': row.get('Tipe', 'INFO'),
+            'kategori': row.get('Kategori', 'Lainnya'),
+            'saldo': int(row.get('Saldo', 0)),
+            'bukti': row.get('Bukti', ''),
+            'private': row.get('Private', 'No')
+        }
+    
+    def _tail_rows(self, path: str, n: int) -> List[List[str]]:
+        """
+        Read the last n CSV records of a file through a memory map
+        
+        Quoted fields may contain line breaks, so a line break only counts as
+        a record boundary when the tail after it holds an even number of
+        quotes (the file always ends on a complete record).
+        
+        Args:
+            path: File path
+            n: Number of records to return
+            
+        Returns:
+            List of parsed rows (header excluded), oldest first
+        """
+        if not os.path.getsize(path):
+            return []
+        
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Ignore the trailing line break, then walk back n record boundaries
+            end = len(mm)
+            if mm[end - 1:end] == b'\n':
+                end -= 1
+            
+            start = end
+            quotes = 0
+            found = 0
+            while found < n and start != -1:
+                prev = start
+                start = mm.rfind(b'\n', 0, start)
+                quotes += mm[start + 1:prev].count(b'"')
+                if quotes % 2 == 0:
+                    found += 1
+            
+            # Only the tail slice is copied out of the mapping
+            tail = mm[start + 1:end]
+        
+        reader = csv.reader(io.StringIO(tail.decode('utf-8', errors='ignore'), newline=''))
+        rows = [row for row in reader if len(row) == len(TRANSACTION_HEADERS) and row != TRANSACTION_HEADERS]
+        return rows[-n:]
+    
     def get_current_balance(self) -> int:
         """
         Get current balance from local backup
@@ -187,12 +568,7 @@ class BackupService:
             int: Current balance
         """
         try:
-            transactions = self.get_transactions()
-            
-            if transactions:
-                return transactions[-1].get('saldo', 0)
-            
-            return 0
+            return self._last_balance or 0
             
         except Exception as e:
             print(f"❌ Error getting current balance from backup: {str(e)}")
@@ -207,12 +583,25 @@ class BackupService:
         """
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f"full_backup_{timestamp}.csv"
+            backup_filename = f"full_backup_{timestamp}.csv.gz"
             backup_path = os.path.join(self.backup_dir, backup_filename)
             
             # Copy current transactions file
+            self.flush()
             if os.path.exists(self.transactions_file):
-                shutil.copy2(self.transactions_file, backup_path)
+                st = os.stat(self.transactions_file)
+                signature = (st.st_size, st.st_mtime_ns)
+                
+                # Skip the copy if nothing changed since the last full backup
+                if self._last_full_backup and self._last_full_backup[0] == signature:
+                    last_filename = self._last_full_backup[1]
+                    if os.path.exists(os.path.join(self.backup_dir, last_filename)):
+                        self._update_last_backup_info('full', 'success', last_filename)
+                        print(f"✅ Full backup unchanged: {last_filename}")
+                        return last_filename
+                
+                self._compress_file(self.transactions_file, backup_path)
+                self._last_full_backup = (signature, backup_filename)
                 
                 # Update last backup info
                 self._update_last_backup_info('full', 'success', backup_filename)
@@ -228,6 +617,13 @@ class BackupService:
             self._update_last_backup_info('full', 'failed', '')
             return ""
     
+    def _compress_file(self, src: str, dst: str):
+        """Gzip a file in fast mode (level 1), replacing dst atomically"""
+        temp_file = f"{dst}.tmp"
+        with open(src, 'rb') as fsrc, gzip.open(temp_file, 'wb', compresslevel=1) as fdst:
+            shutil.copyfileobj(fsrc, fdst, 1 << 20)
+        os.replace(temp_file, dst)
+    
     def restore_from_backup(self, backup_filename: str) -> bool:
         """
         Restore from a backup file
@@ -247,11 +643,27 @@ class BackupService:
             
             # Create backup of current file
             current_backup = f"restore_backup_{int(time.time())}.csv"
-            if os.path.exists(self.transactions_file):
-                shutil.copy2(self.transactions_file, os.path.join(self.backup_dir, current_backup))
-            
-            # Restore from backup
-            shutil.copy2(backup_path, self.transactions_file)
+            self.flush()
+            with self._lock:
+                # Release the writer so the file can be replaced
+                if self._fh:
+                    self._fh.close()
+                    self._fh = None
+                
+                try:
+                    if os.path.exists(self.transactions_file):
+                        shutil.copy2(self.transactions_file, os.path.join(self.backup_dir, current_backup))
+                    
+                    # Restore from backup, decompressing gzipped full backups
+                    if backup_filename.endswith('.gz'):
+                        with gzip.open(backup_path, 'rb') as fsrc, open(self.transactions_file, 'wb') as fdst:
+                            shutil.copyfileobj(fsrc, fdst, 1 << 20)
+                    else:
+                        shutil.copy2(backup_path, self.transactions_file)
+                finally:
+                    self._load_cached_state()
+                    self._load_key_index(rebuild=True)
+                    self._open_writer()
             
             print(f"✅ Restored from backup: {backup_filename}")
             return True
@@ -270,23 +682,21 @@ class BackupService:
         try:
             cleaned_count = 0
             
-            # Get all backup files
+            # Get all backup files (scandir reuses the directory entry stat)
             backup_files = []
-            for file in os.listdir(self.backup_dir):
-                if file.startswith('full_backup_') and file.endswith('.csv'):
-                    file_path = os.path.join(self.backup_dir, file)
-                    backup_files.append((file, os.path.getmtime(file_path)))
+            with os.scandir(self.backup_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith('full_backup_') and entry.name.endswith(('.csv', '.csv.gz')):
+                        backup_files.append((entry.path, entry.stat().st_mtime))
             
             # Sort by modification time (newest first)
             backup_files.sort(key=lambda x: x[1], reverse=True)
             
-            # Keep only max_backup_files
-            for file, _ in backup_files[self.max_backup_files:]:
-                try:
-                    os.remove(os.path.join(self.backup_dir, file))
-                    cleaned_count += 1
-                except:
-                    pass
+            # Keep only max_backup_files, deleting the rest concurrently
+            old_paths = [path for path, _ in backup_files[self.max_backup_files:]]
+            if old_paths:
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    cleaned_count = sum(executor.map(self._remove_file, old_paths))
             
             if cleaned_count > 0:
                 print(f"✅ Cleaned up {cleaned_count} old backup files")
@@ -297,22 +707,42 @@ class BackupService:
             print(f"❌ Error cleaning up old backups: {str(e)}")
             return 0
     
+    def _remove_file(self, path: str) -> bool:
+        """Remove a file, returning False instead of raising"""
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+    
     def _update_last_backup_info(self, backup_type: str, status: str, filename: str):
         """Update last backup information"""
         try:
+            self._last_backup_ts = time.time()
             last_backup = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': datetime.fromtimestamp(self._last_backup_ts).isoformat(),
+                'timestamp_epoch': self._last_backup_ts,
                 'type': backup_type,
                 'status': status,
                 'filename': filename
             }
             
-            with open(self.last_backup_file, 'w', encoding='utf-8') as f:
-                json.dump(last_backup, f, indent=2, ensure_ascii=False)
+            # Inline: concurrent writers would race on the shared .tmp path
+            self._write_last_backup_file(last_backup)
                 
         except Exception as e:
             print(f"❌ Error updating last backup info: {str(e)}")
     
+    def _write_last_backup_file(self, last_backup: Dict[str, Any]):
+        """Atomically write last backup information"""
+        try:
+            temp_file = f"{self.last_backup_file}.tmp"
+            self._dump_json(last_backup, temp_file)
+            os.replace(temp_file, self.last_backup_file)
+            
+        except Exception as e:
+            print(f"❌ Error writing last backup info: {str(e)}")
+    
     def get_backup_info(self) -> Dict[str, Any]:
         """
         Get backup system information
@@ -331,41 +761,38 @@ class BackupService:
             }
             
             # Get transactions count
-            transactions = self.get_transactions()
-            info['transactions_count'] = len(transactions)
-            
-            # Get backup files
-            if os.path.exists(self.backup_dir):
-                for file in os.listdir(self.backup_dir):
-                    if file.endswith('.csv'):
-                        file_path = os.path.join(self.backup_dir, file)
-                        file_size = os.path.getsize(file_path)
-                        file_mtime = os.path.getmtime(file_path)
-                        
-                        info['backup_files'].append({
-                            'filename': file,
-                            'size': file_size,
-                            'size_mb': round(file_size / (1024 * 1024), 2),
-                            'modified': datetime.fromtimestamp(file_mtime).isoformat()
-                        })
+            info['transactions_count'] = self._tx_count
             
-            # Get last backup info
-            if os.path.exists(self.last_backup_file):
-                with open(self.last_backup_file, 'r', encoding='utf-8') as f:
-                    info['last_backup'] = json.load(f)
-            
-            # Get disk usage
+            # Get backup files and disk usage in a single pass (backup dir is flat)
             if os.path.exists(self.backup_dir):
+                self.flush()
                 total_size = 0
-                for root, dirs, files in os.walk(self.backup_dir):
-                    for file in files:
-                        total_size += os.path.getsize(os.path.join(root, file))
+                
+                with os.scandir(self.backup_dir) as entries:
+                    for entry in entries:
+                        if not entry.is_file():
+                            continue
+                        
+                        st = entry.stat()
+                        total_size += st.st_size
+                        
+                        if entry.name.endswith(('.csv', '.csv.gz')):
+                            info['backup_files'].append({
+                                'filename': entry.name,
+                                'size': st.st_size,
+                                'size_mb': round(st.st_size / (1024 * 1024), 2),
+                                'modified': datetime.fromtimestamp(st.st_mtime).isoformat()
+                            })
                 
                 info['disk_usage'] = {
                     'total_size': total_size,
                     'total_size_mb': round(total_size / (1024 * 1024), 2)
                 }
             
+            # Get last backup info
+            if os.path.exists(self.last_backup_file):
+                info['last_backup'] = self._load_json(self.last_backup_file)
+            
             return info
             
         except Exception as e:
@@ -387,9 +814,9 @@ class BackupService:
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 filename = f"transactions_export_{timestamp}.xlsx"
             
-            transactions = self.get_transactions()
+            self.flush()
             
-            if not transactions:
+            if not self._tx_count:
                 print("❌ No transactions to export")
                 return ""
             
@@ -397,27 +824,23 @@ class BackupService:
             try:
                 from openpyxl import Workbook
                 
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Transactions"
+                # Write-only workbook streams rows to disk instead of keeping cells in memory
+                wb = Workbook(write_only=True)
+                ws = wb.create_sheet("Transactions")
                 
                 # Add headers
-                headers = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori', 'Saldo', 'Bukti', 'Private']
-                ws.append(headers)
+                ws.append(TRANSACTION_HEADERS)
                 
-                # Add data
-                for trans in transactions:
-                    row = [
-                        trans.get('tanggal', ''),
-                        trans.get('deskripsi', ''),
-                        trans.get('jumlah', 0),
-                        trans.get('tipe', 'INFO'),
-                        trans.get('kategori', 'Lainnya'),
-                        trans.get('saldo', 0),
-                        trans.get('bukti', ''),
-                        trans.get('private', 'No')
-                    ]
-                    ws.append(row)
+                # Stream data rows straight from the CSV
+                with open(self.transactions_file, 'r', newline='', encoding='utf-8') as csvfile:
+                    reader = csv.reader(csvfile)
+                    next(reader, None)  # Skip header
+                    
+                    for row in reader:
+                        # Keep amounts numeric in Excel
+                        row[2] = int(row[2] or 0)
+                        row[5] = int(row[5] or 0)
+                        ws.append(row)
                 
                 # Save file
                 output_path = os.path.join(self.backup_dir, filename)
@@ -489,26 +912,30 @@ class BackupService:
                 'errors': 0
             }
             
-            # Get local transactions
-            local_transactions = self.get_transactions()
-            results['local_count'] = len(local_transactions)
+            # Local dedup keys come from the persistent key index
+            results['local_count'] = self._tx_count
+            local_keys = self._key_set
             
             # Get sheets transactions
             sheets_transactions = sheets_service.get_recent_transactions(1000)
             results['sheets_count'] = len(sheets_transactions)
             
             # Find missing transactions in local backup
-            local_descriptions = {t['deskripsi'] + t['tanggal'] for t in local_transactions}
+            missing_rows = [
+                self._build_row(sheet_trans)
+                for sheet_trans in sheets_transactions
+                if _key_hash(sheet_trans['deskripsi'] + sheet_trans['tanggal']) not in local_keys
+            ]
             
-            for sheet_trans in sheets_transactions:
-                sheet_key = sheet_trans['deskripsi'] + sheet_trans['tanggal']
-                
-                if sheet_key not in local_descriptions:
-                    # Save missing transaction to local backup
-                    if self.save_transaction(sheet_trans):
-                        results['synced'] += 1
-                    else:
-                        results['errors'] += 1
+            # Save missing transactions to local backup in one write
+            if missing_rows:
+                try:
+                    self._append_rows(missing_rows)
+                    self.flush()
+                    results['synced'] = len(missing_rows)
+                except Exception as e:
+                    print(f"❌ Error saving synced transactions: {str(e)}")
+                    results['errors'] = len(missing_rows)
             
             print(f"✅ Sync completed: {results['synced']} synced, {results['errors']} errors")
             return results
@@ -530,16 +957,7 @@ class BackupService:
             bool: True if backup is needed
         """
         try:
-            if not os.path.exists(self.last_backup_file):
-                return True
-            
-            with open(self.last_backup_file, 'r', encoding='utf-8') as f:
-                last_backup = json.load(f)
-            
-            last_backup_time = datetime.fromisoformat(last_backup['timestamp'])
-            time_diff = datetime.now() - last_backup_time
-            
-            return time_diff.total_seconds() > self.backup_interval
+            return (time.time() - self._last_backup_ts) > self.backup_interval
             
         except Exception as e:
             print(f"❌ Error checking if backup needed: {str(e)}")
@@ -5,23 +5,64 @@ Google Drive Service - Upload foto bukti ke Google Drive
 """
 
 import os
+import io
 import json
 import time
+import shutil
+import statistics
 import requests
-from typing import Optional, Dict, Any
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple
 from datetime import datetime
 from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload, build_http
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
+# Uploads up to this size go as a single multipart request instead of a resumable session
+SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024
+
+# Chunk size for resumable uploads; a failed chunk is retried without resending the rest
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Maximum number of calls in one Drive batch request
+BATCH_LIMIT = 100
+
 class DriveService:
     def __init__(self):
         self.health_status = True
         self.service = None
+        self.creds = None
         self.folder_id = None
+        self.folder_cache_file = os.path.expanduser('~/.bos_upety_folder_id')
+        self._file_count = None  # Files in the bot folder, counted once then kept in step
+        self._count_lock = threading.Lock()
+        self._local = threading.local()  # Per-thread HTTP transport (httplib2 isn't thread-safe)
+        
+        # API latency metrics per method (last 500 calls), plus upload retries/backoff
+        self._metrics = defaultdict(lambda: deque(maxlen=500))
+        self._retries = defaultdict(int)
+        self._backoff_seconds = defaultdict(float)
+        
+        # Pooled session for image downloads
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        ))
         
         # Initialize Google Drive connection
         self._initialize_connection()
@@ -39,15 +80,19 @@ class DriveService:
                 # Fallback: try environment variable
                 creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
                 if creds_json:
-                    creds = Credentials.from_service_account_info(json.loads(creds_json), scopes=scope)
+                    info = orjson.loads(creds_json) if orjson else json.loads(creds_json)
+                    creds = Credentials.from_service_account_info(info, scopes=scope)
                 else:
                     raise Exception("No credentials found")
             
             # Initialize service
+            self.creds = creds
+            self._local = threading.local()
             self.service = build('drive', 'v3', credentials=creds)
             
             # Create or find bot folder
             self.folder_id = self._create_or_find_folder()
+            self._file_count = None
             
             self.health_status = True
             print("✅ Google Drive connected successfully")
@@ -62,12 +107,23 @@ class DriveService:
             if not self.service:
                 return None
             
+            # Cached folder id: a point lookup is cheaper than a search
+            cached_id = self._load_cached_folder_id()
+            if cached_id:
+                try:
+                    folder = self._timed_execute(self.service.files().get(fileId=cached_id, fields='id,trashed'), 'files.get')
+                    if not folder.get('trashed'):
+                        return folder['id']
+                except Exception:
+                    pass  # Stale cache, search again
+            
             # Search for existing folder
             query = "name='Bos Upety Bot Bukti' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            results = self.service.files().list(q=query, fields="files(id, name)").execute()
+            results = self._timed_execute(self.service.files().list(q=query, fields="files(id)"), 'files.list')
             files = results.get('files', [])
             
             if files:
+                self._save_cached_folder_id(files[0]['id'])
                 return files[0]['id']
             
             # Create new folder
@@ -76,14 +132,75 @@ class DriveService:
                 'mimeType': 'application/vnd.google-apps.folder'
             }
             
-            folder = self.service.files().create(body=folder_metadata, fields='id').execute()
+            folder = self._timed_execute(self.service.files().create(body=folder_metadata, fields='id'), 'files.create')
             print(f"✅ Created folder: {folder.get('id')}")
+            self._save_cached_folder_id(folder.get('id'))
             return folder.get('id')
             
         except Exception as e:
             print(f"Error creating/finding folder: {str(e)}")
             return None
     
+    def _load_cached_folder_id(self) -> Optional[str]:
+        """Read the cached bot folder id"""
+        try:
+            with open(self.folder_cache_file, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    def _save_cached_folder_id(self, folder_id: Optional[str]):
+        """Remember the bot folder id for the next start/reconnect"""
+        if not folder_id:
+            return
+        try:
+            with open(self.folder_cache_file, 'w', encoding='utf-8') as f:
+                f.write(folder_id)
+        except OSError as e:
+            print(f"Error caching folder id: {str(e)}")
+    
+    def _thread_http(self) -> Optional[AuthorizedHttp]:
+        """Get this thread's authorized HTTP transport"""
+        if not self.creds:
+            return None
+        
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            # build_http() sets the socket timeout (60 s) a bare httplib2.Http() lacks
+            http = AuthorizedHttp(self.creds, http=build_http())
+            self._local.http = http
+        return http
+    
+    def _timed_execute(self, request, label: str, **kwargs):
+        """Execute a Drive API request and record its wall time under label"""
+        t0 = time.perf_counter()
+        try:
+            return request.execute(**kwargs)
+        finally:
+            self._metrics[label].append(time.perf_counter() - t0)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get Drive API latency metrics
+        
+        Returns:
+            Dict: Per-method call count, median/P95 latency (ms), retries and backoff seconds
+        """
+        metrics = {}
+        for label, samples in list(self._metrics.items()):
+            samples = list(samples)
+            if not samples:
+                continue
+            p95 = statistics.quantiles(samples, n=20)[18] if len(samples) > 1 else samples[0]
+            metrics[label] = {
+                'count': len(samples),
+                'median_ms': round(statistics.median(samples) * 1000, 1),
+                'p95_ms': round(p95 * 1000, 1),
+                'retries': self._retries.get(label, 0),
+                'backoff_seconds': self._backoff_seconds.get(label, 0.0)
+            }
+        return metrics
+    
     def upload_image_from_url(self, image_url: str, filename: str = None) -> Optional[str]:
         """
         Upload image from URL to Google Drive
@@ -99,35 +216,56 @@ class DriveService:
             if not self.service or not self.folder_id:
                 return None
             
-            # Download image
-            response = requests.get(image_url, timeout=10)
-            if response.status_code != 200:
-                print(f"Failed to download image: {response.status_code}")
-                return None
-            
-            # Generate filename if not provided
-            if not filename:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"bukti_{timestamp}.jpg"
+            # Stream the image straight into memory, no temp file
+            buf = io.BytesIO()
+            with self.session.get(image_url, stream=True, timeout=10) as response:
+                if response.status_code != 200:
+                    print(f"Failed to download image: {response.status_code}")
+                    return None
+                
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, buf, 1 << 16)
             
-            # Save to temporary file
-            temp_file = f"temp_{filename}"
-            with open(temp_file, 'wb') as f:
-                f.write(response.content)
+            return self._upload_bytes(buf, filename, 'image/jpeg')
             
-            # Upload to Drive
-            file_id = self._upload_file(temp_file, filename)
+        except Exception as e:
+            print(f"Error uploading image from URL: {str(e)}")
+            return None
+    
+    def upload_bytes(self, data: bytes, filename: str = None, mime: str = 'image/jpeg') -> Optional[str]:
+        """
+        Upload bytes that were already downloaded (e.g. foto nota)
+        
+        Args:
+            data: Isi file
+            filename: Nama file (optional)
+            mime: MIME type file
             
-            # Clean up temp file
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        Returns:
+            str: Google Drive file ID atau None jika gagal
+        """
+        try:
+            if not self.service or not self.folder_id:
+                return None
             
-            return file_id
+            return self._upload_bytes(io.BytesIO(data), filename, mime)
             
         except Exception as e:
-            print(f"Error uploading image from URL: {str(e)}")
+            print(f"Error uploading bytes: {str(e)}")
             return None
     
+    def _upload_bytes(self, buf: io.BytesIO, filename: Optional[str], mime: str) -> Optional[str]:
+        """Upload an in-memory buffer, in a single request when it is small"""
+        # Generate filename if not provided
+        if not filename:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"bukti_{timestamp}.jpg"
+        
+        size = buf.seek(0, io.SEEK_END)
+        buf.seek(0)
+        media = MediaIoBaseUpload(buf, mimetype=mime, chunksize=RESUMABLE_CHUNK_SIZE, resumable=size > SIMPLE_UPLOAD_LIMIT)
+        return self._upload_media(media, filename)
+    
     def upload_file(self, file_path: str, filename: str = None) -> Optional[str]:
         """
         Upload file to Google Drive
@@ -158,6 +296,14 @@ class DriveService:
     
     def _upload_file(self, file_path: str, filename: str) -> Optional[str]:
         """Internal method to upload file"""
+        if os.path.getsize(file_path) > SIMPLE_UPLOAD_LIMIT:
+            media = MediaFileUpload(file_path, chunksize=RESUMABLE_CHUNK_SIZE, resumable=True)
+        else:
+            media = MediaFileUpload(file_path, resumable=False)
+        return self._upload_media(media, filename)
+    
+    def _upload_media(self, media, filename: str) -> Optional[str]:
+        """Internal method to upload a prepared media body"""
         try:
             # Retry mechanism
             for attempt in range(3):
@@ -168,29 +314,30 @@ class DriveService:
                         'parents': [self.folder_id]
                     }
                     
-                    # Media upload
-                    media = MediaFileUpload(file_path, resumable=True)
-                    
                     # Upload file
-                    file = self.service.files().create(
+                    file = self._timed_execute(self.service.files().create(
                         body=file_metadata,
                         media_body=media,
                         fields='id'
-                    ).execute()
+                    ), 'files.create', http=self._thread_http(), num_retries=2)
                     
                     # Make file publicly viewable
-                    self.service.permissions().create(
+                    self._timed_execute(self.service.permissions().create(
                         fileId=file.get('id'),
-                        body={'role': 'reader', 'type': 'anyone'}
-                    ).execute()
+                        body={'role': 'reader', 'type': 'anyone'},
+                        fields='id'
+                    ), 'permissions.create', http=self._thread_http())
                     
                     self.health_status = True
+                    self._adjust_file_count(1)
                     print(f"✅ File uploaded: {filename} (ID: {file.get('id')})")
                     return file.get('id')
                     
                 except Exception as e:
                     if attempt == 2:  # Last attempt
                         raise e
+                    self._retries['files.create'] += 1
+                    self._backoff_seconds['files.create'] += 1
                     time.sleep(1)  # Wait before retry
                     
         except Exception as e:
@@ -198,6 +345,32 @@ class DriveService:
             print(f"❌ Error uploading file: {str(e)}")
             return None
     
+    def upload_many(self, items: Iterable[str], max_workers: int = 8) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Upload many images/files concurrently
+        
+        Args:
+            items: Image URLs or local file paths
+            max_workers: Concurrent uploads (capped at 8 to stay under Drive's write rate limit)
+            
+        Returns:
+            Iterator of (item, file_id) as each upload finishes; file_id is None on failure
+        """
+        items = list(items)
+        if not items:
+            return
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, 8, len(items)))) as executor:
+            futures = {executor.submit(self._upload_item, item): item for item in items}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    
+    def _upload_item(self, item: str) -> Optional[str]:
+        """Upload one URL or local path"""
+        if item.startswith(('http://', 'https://')):
+            return self.upload_image_from_url(item)
+        return self.upload_file(item)
+    
     def get_file_url(self, file_id: str) -> Optional[str]:
         """
         Get public URL for file
@@ -213,7 +386,7 @@ class DriveService:
                 return None
             
             # Get file info
-            file = self.service.files().get(fileId=file_id, fields='webViewLink').execute()
+            file = self._timed_execute(self.service.files().get(fileId=file_id, fields='webViewLink'), 'files.get')
             return file.get('webViewLink')
             
         except Exception as e:
@@ -246,7 +419,8 @@ class DriveService:
             if not self.service:
                 return False
             
-            self.service.files().delete(fileId=file_id).execute()
+            self._timed_execute(self.service.files().delete(fileId=file_id), 'files.delete')
+            self._adjust_file_count(-1)
             print(f"✅ File deleted: {file_id}")
             return True
             
@@ -254,12 +428,13 @@ class DriveService:
             print(f"Error deleting file: {str(e)}")
             return False
     
-    def list_files(self, limit: int = 10) -> list:
+    def list_files(self, limit: int = 10, fields: str = "files(id,name,createdTime,size,webViewLink)") -> list:
         """
         List files in the bot folder
         
         Args:
             limit: Maximum number of files to return
+            fields: Drive fields selector; hot callers can narrow it, e.g. "files(id,name)"
             
         Returns:
             list: List of file information
@@ -269,11 +444,11 @@ class DriveService:
                 return []
             
             query = f"'{self.folder_id}' in parents and trashed=false"
-            results = self.service.files().list(
+            results = self._timed_execute(self.service.files().list(
                 q=query,
                 pageSize=limit,
-                fields="files(id, name, createdTime, size, webViewLink)"
-            ).execute()
+                fields=fields
+            ), 'files.list')
             
             files = results.get('files', [])
             return files
@@ -293,31 +468,56 @@ class DriveService:
             if not self.service or not self.folder_id:
                 return {}
             
-            folder = self.service.files().get(fileId=self.folder_id, fields='id,name,createdTime,size').execute()
+            folder = self._timed_execute(self.service.files().get(fileId=self.folder_id, fields='id,name,createdTime'), 'files.get')
             
-            # Get file count
-            query = f"'{self.folder_id}' in parents and trashed=false"
-            results = self.service.files().list(q=query, fields="files(id)").execute()
-            file_count = len(results.get('files', []))
+            # Get file count: one full listing, then kept up to date in memory
+            if self._file_count is None:
+                self._file_count = self._count_folder_files()
+            file_count = self._file_count
             
             return {
                 'id': folder.get('id'),
                 'name': folder.get('name'),
                 'created_time': folder.get('createdTime'),
                 'file_count': file_count,
-                'url': f"https://drive.google.com/drive/folders/{self.folder_id}"
+                'url': f"https://drive.google.com/drive/folders/{self.folder_id}",
+                'api_metrics': self.get_metrics()
             }
             
         except Exception as e:
             print(f"Error getting folder info: {str(e)}")
             return {}
     
-    def cleanup_old_files(self, days: int = 30) -> int:
+    def _adjust_file_count(self, delta: int):
+        """Keep the cached folder file count in step with uploads/deletes"""
+        with self._count_lock:
+            if self._file_count is not None:
+                self._file_count = max(self._file_count + delta, 0)
+    
+    def _count_folder_files(self) -> int:
+        """Count files in the bot folder, paging through ids only"""
+        query = f"'{self.folder_id}' in parents and trashed=false"
+        count = 0
+        page_token = None
+        while True:
+            results = self._timed_execute(self.service.files().list(
+                q=query,
+                pageSize=1000,
+                fields="nextPageToken,files(id)",
+                pageToken=page_token
+            ), 'files.list')
+            count += len(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return count
+    
+    def cleanup_old_files(self, days: int = 30, batch_size: int = BATCH_LIMIT) -> int:
         """
         Clean up old files (older than specified days)
         
         Args:
             days: Number of days to keep files
+            batch_size: Deletes per batch HTTP request (capped at BATCH_LIMIT)
             
         Returns:
             int: Number of files deleted
@@ -330,17 +530,40 @@ class DriveService:
             cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
             cutoff_iso = datetime.fromtimestamp(cutoff_date).isoformat() + 'Z'
             
-            # Find old files
+            # Find old files, paging through ids only (a single list stops at 100)
             query = f"'{self.folder_id}' in parents and trashed=false and createdTime < '{cutoff_iso}'"
-            results = self.service.files().list(q=query, fields="files(id, name, createdTime)").execute()
-            old_files = results.get('files', [])
+            old_files = []
+            page_token = None
+            while True:
+                results = self._timed_execute(self.service.files().list(
+                    q=query,
+                    pageSize=1000,
+                    fields="nextPageToken,files(id)",
+                    pageToken=page_token
+                ), 'files.list')
+                old_files.extend(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            
+            # Delete old files, up to batch_size per HTTP round-trip
+            batch_size = max(1, min(batch_size, BATCH_LIMIT))
+            deleted = []
+            
+            def on_delete(request_id, response, exception):
+                if exception is None:
+                    deleted.append(request_id)
+                else:
+                    print(f"Error deleting file {request_id}: {str(exception)}")
             
-            # Delete old files
-            deleted_count = 0
-            for file in old_files:
-                if self.delete_file(file['id']):
-                    deleted_count += 1
+            for i in range(0, len(old_files), batch_size):
+                batch = self.service.new_batch_http_request(callback=on_delete)
+                for file in old_files[i:i + batch_size]:
+                    batch.add(self.service.files().delete(fileId=file['id']), request_id=file['id'])
+                self._timed_execute(batch, 'batch.delete')
             
+            deleted_count = len(deleted)
+            self._adjust_file_count(-deleted_count)
             print(f"✅ Cleaned up {deleted_count} old files")
             return deleted_count
             
@@ -373,7 +596,7 @@ class DriveService:
                 return {}
             
             # Get about info (includes storage quota)
-            about = self.service.about().get(fields='storageQuota').execute()
+            about = self._timed_execute(self.service.about().get(fields='storageQuota'), 'about.get')
             quota = about.get('storageQuota', {})
             
             return {
@@ -5,21 +5,103 @@ Gemini Service - Integrasi AI Gemini 2.5 Pro untuk analisis transaksi
 """
 
 import os
+import re
 import json
 import base64
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Optional, Any
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
+# Fallback keyword matching, one compiled alternation per bucket (substring match, like `in`)
+_AMOUNT_RE = re.compile(r'\d+')
+_TYPE_IN_RE = re.compile(r'tf|transfer|terima|dari|masuk', re.I)
+_TYPE_OUT_RE = re.compile(r'beli|bayar|keluar|habis', re.I)
+_CATEGORY_PATTERNS = [
+    ('Makanan & Minuman', re.compile(r'makan|minum|kopi|restoran|snack', re.I)),
+    ('Transportasi', re.compile(r'bensin|parkir|tol|gojek|grab|ojek', re.I)),
+    ('Hiburan', re.compile(r'hotel|karaoke|spa|pijat', re.I)),
+    ('Pribadi', re.compile(r'rokok|parfum|hadiah|baju|sepatu', re.I)),
+    ('Rumah Tangga', re.compile(r'sabun|deterjen|tissue|rumah', re.I)),
+    ('Keuangan', re.compile(r'transfer|top up|kirim|tf', re.I)),
+]
+
+def _dumps(data: Any) -> bytes:
+    """Serialize a request body to JSON bytes, using orjson when available"""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+# Shared request settings
+GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "topK": 1,
+    "topP": 0.8,
+    "maxOutputTokens": 1024,
+}
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Statuses the session already retries; still failing after that means Gemini is down
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Fields a Gemini JSON answer must have
+REQUIRED_FIELDS = ('deskripsi', 'jumlah', 'tipe', 'kategori', 'tanggapan_bot')
+_JSON_DECODER = json.JSONDecoder()
+
+def _extract_json(content: str) -> Optional[Dict[str, Any]]:
+    """Return the first {...} block in content that parses and has all required fields"""
+    start = content.find('{')
+    while start != -1:
+        try:
+            candidate, end = _JSON_DECODER.raw_decode(content, start)
+        except ValueError:
+            start = content.find('{', start + 1)
+            continue
+        
+        if isinstance(candidate, dict) and all(field in candidate for field in REQUIRED_FIELDS):
+            return candidate
+        start = content.find('{', start + 1)
+    return None
+
+def _loads(data):
+    """Parse JSON from bytes/str, using orjson when available"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
 class GeminiService:
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
         self.model = "models/gemini-2.5-pro"
         self.base_url = "https://generativelanguage.googleapis.com/v1beta"
+        self.generate_url = f"{self.base_url}/{self.model}:generateContent"
         self.health_status = True
         
+        # Pooled HTTP session: reuse TLS connections and retry transient errors
+        # with exponential backoff (urllib3 2.x: 0s, 2s, 4s), honoring Retry-After on 429/503
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=1,
+                backoff_max=30,
+                status_forcelist=_RETRY_STATUSES,
+                allowed_methods=frozenset(['GET', 'POST']),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        ))
+        
         # Master prompt untuk AI
         self.master_prompt = """
 Kamu adalah asisten keuangan pribadi digital untuk seorang bos (0811-5302-098) dan bendahara pribadinya (082181151735).
@@ -55,6 +137,9 @@ Output: {
   "tanggapan_bot": "✅ Dicatat: beli rokok\\n💸 Rp25.000\\n📂 Kategori: Pribadi"
 }
 """
+        
+        # Master prompt dikirim sebagai systemInstruction, dibuat sekali dan dipakai ulang
+        self._system_instruction = {"parts": [{"text": self.master_prompt}]}
     
     def analyze_transaction(self, message_text: str, media_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
@@ -68,20 +153,16 @@ Output: {
             Dict hasil analisis atau None jika gagal
         """
         try:
-            # Retry mechanism
-            for attempt in range(3):
-                try:
-                    if media_url:
-                        return self._analyze_with_image(message_text, media_url)
-                    else:
-                        return self._analyze_text_only(message_text)
-                        
-                except Exception as e:
-                    if attempt == 2:  # Last attempt
-                        self.health_status = False
-                        raise e
-                    time.sleep(1)  # Wait before retry
-                    
+            # Retries happen in the session's HTTPAdapter
+            if media_url:
+                result = self._analyze_with_image(message_text, media_url)
+            else:
+                result = self._analyze_text_only(message_text)
+            
+            if result is None:
+                self.health_status = False
+            return result
+            
         except Exception as e:
             print(f"Error analyze transaction: {str(e)}")
             return None
@@ -89,60 +170,11 @@ Output: {
     def _analyze_text_only(self, message_text: str) -> Optional[Dict[str, Any]]:
         """Analisis teks saja tanpa gambar"""
         try:
-            url = f"{self.base_url}/{self.model}:generateContent"
-            headers = {
-                'Content-Type': 'application/json',
-            }
-            
-            payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": f"{self.master_prompt}\n\nPesan transaksi: {message_text}"
-                    }]
-                }],
-                "generationConfig": {
-                    "temperature": 0.1,
-                    "topK": 1,
-                    "topP": 0.8,
-                    "maxOutputTokens": 1024,
-                }
-            }
-            
-            response = requests.post(
-                f"{url}?key={self.api_key}",
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['candidates'][0]['content']['parts'][0]['text']
-                
-                # Parse JSON response
-                try:
-                    # Extract JSON from response
-                    json_start = content.find('{')
-                    json_end = content.rfind('}') + 1
-                    
-                    if json_start != -1 and json_end != -1:
-                        json_str = content[json_start:json_end]
-                        parsed_result = json.loads(json_str)
-                        
-                        # Validate required fields
-                        required_fields = ['deskripsi', 'jumlah', 'tipe', 'kategori', 'tanggapan_bot']
-                        if all(field in parsed_result for field in required_fields):
-                            self.health_status = True
-                            return parsed_result
-                    
-                    # Fallback parsing
-                    return self._fallback_parse(message_text, content)
-                    
-                except json.JSONDecodeError:
-                    return self._fallback_parse(message_text, content)
-            else:
-                print(f"Gemini API error: {response.status_code} - {response.text}")
+            content = self._call_gemini([{"text": f"Pesan transaksi: {message_text}"}], timeout=10)
+            if content is None:
                 return None
+            
+            return self._parse_reply(message_text, content)
                 
         except Exception as e:
             print(f"Error in text analysis: {str(e)}")
@@ -156,80 +188,84 @@ Output: {
             if not image_data:
                 return self._analyze_text_only(message_text)
             
-            # Encode image to base64
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            url = f"{self.base_url}/{self.model}:generateContent"
-            headers = {
-                'Content-Type': 'application/json',
-            }
-            
-            payload = {
-                "contents": [{
-                    "parts": [
-                        {
-                            "text": f"{self.master_prompt}\n\nPesan transaksi: {message_text}\n\nAnalisis juga gambar nota yang dikirim."
-                        },
-                        {
-                            "inline_data": {
-                                "mime_type": "image/jpeg",
-                                "data": image_base64
-                            }
-                        }
-                    ]
-                }],
-                "generationConfig": {
-                    "temperature": 0.1,
-                    "topK": 1,
-                    "topP": 0.8,
-                    "maxOutputTokens": 1024,
-                }
-            }
-            
-            response = requests.post(
-                f"{url}?key={self.api_key}",
-                headers=headers,
-                json=payload,
-                timeout=15
-            )
+            # Encode image to base64 and drop the raw bytes right away: this is
+            # the only reference, so they aren't held alongside the base64 copy
+            # for the whole request
+            parts = [
+                {"text": f"Pesan transaksi: {message_text}\n\nAnalisis juga gambar nota yang dikirim."},
+                {"inline_data": {"mime_type": "image/jpeg", "data": base64.b64encode(image_data).decode('ascii')}}
+            ]
+            del image_data
             
-            if response.status_code == 200:
-                result = response.json()
-                content = result['candidates'][0]['content']['parts'][0]['text']
-                
-                # Parse JSON response
-                try:
-                    json_start = content.find('{')
-                    json_end = content.rfind('}') + 1
-                    
-                    if json_start != -1 and json_end != -1:
-                        json_str = content[json_start:json_end]
-                        parsed_result = json.loads(json_str)
-                        
-                        # Add media URL to bukti
-                        parsed_result['bukti'] = media_url
-                        
-                        required_fields = ['deskripsi', 'jumlah', 'tipe', 'kategori', 'tanggapan_bot']
-                        if all(field in parsed_result for field in required_fields):
-                            self.health_status = True
-                            return parsed_result
-                    
-                    return self._fallback_parse(message_text, content)
-                    
-                except json.JSONDecodeError:
-                    return self._fallback_parse(message_text, content)
-            else:
-                print(f"Gemini API error with image: {response.status_code} - {response.text}")
+            content = self._call_gemini(parts, timeout=15)
+            if content is None:
                 return self._analyze_text_only(message_text)
+            
+            # Add media URL to bukti
+            return self._parse_reply(message_text, content, bukti=media_url or '')
                 
+        except requests.RequestException as e:
+            # Already retried by the session; a text-only call would just
+            # wait out the same outage again
+            print(f"Error in image analysis: {str(e)}")
+            return None
         except Exception as e:
             print(f"Error in image analysis: {str(e)}")
             return self._analyze_text_only(message_text)
     
+    def _call_gemini(self, parts: list, timeout: int = 10) -> Optional[str]:
+        """
+        Send content parts to Gemini and return the reply text
+        
+        Args:
+            parts: Content parts; cleared after serializing so large inline data is freed early
+            timeout: Request timeout in seconds
+            
+        Returns:
+            str: Reply text atau None jika API error
+            
+        Raises:
+            requests.RequestException: Gemini still unreachable after the session's retries
+        """
+        body = _dumps({
+            "systemInstruction": self._system_instruction,
+            "contents": [{"parts": parts}],
+            "generationConfig": GENERATION_CONFIG
+        })
+        parts.clear()
+        
+        response = self.session.post(
+            self.generate_url,
+            params={'key': self.api_key},
+            headers=_JSON_HEADERS,
+            data=body,
+            timeout=timeout
+        )
+        
+        if response.status_code in _RETRY_STATUSES:
+            raise requests.HTTPError(f"Gemini API error after retries: {response.status_code}", response=response)
+        if response.status_code != 200:
+            print(f"Gemini API error: {response.status_code} - {response.text}")
+            return None
+        
+        result = _loads(response.content)
+        return result['candidates'][0]['content']['parts'][0]['text']
+    
+    def _parse_reply(self, message_text: str, content: str, bukti: Optional[str] = None) -> Dict[str, Any]:
+        """Parse Gemini's JSON reply, falling back to keyword parsing"""
+        parsed_result = _extract_json(content)
+        if not parsed_result:
+            return self._fallback_parse(message_text, content)
+        
+        if bukti is not None:
+            parsed_result['bukti'] = bukti
+        self.health_status = True
+        return parsed_result
+    
     def _download_image(self, url: str) -> Optional[bytes]:
         """Download image from URL"""
         try:
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             if response.status_code == 200:
                 return response.content
             return None
@@ -240,37 +276,24 @@ Output: {
     def _fallback_parse(self, message_text: str, ai_response: str) -> Dict[str, Any]:
         """Fallback parsing jika JSON parsing gagal"""
         try:
-            # Simple keyword-based parsing
-            message_lower = message_text.lower()
-            
             # Extract amount
-            import re
-            amounts = re.findall(r'\d+', message_text)
+            amounts = _AMOUNT_RE.findall(message_text)
             amount = int(amounts[-1]) if amounts else 0
             
             # Determine type
-            if any(word in message_lower for word in ['tf', 'transfer', 'terima', 'dari', 'masuk']):
+            if _TYPE_IN_RE.search(message_text):
                 tipe = 'IN'
-            elif any(word in message_lower for word in ['beli', 'bayar', 'keluar', 'habis']):
+            elif _TYPE_OUT_RE.search(message_text):
                 tipe = 'OUT'
             else:
                 tipe = 'INFO'
             
             # Determine category
-            if any(word in message_lower for word in ['makan', 'minum', 'kopi', 'restoran', 'snack']):
-                kategori = 'Makanan & Minuman'
-            elif any(word in message_lower for word in ['bensin', 'parkir', 'tol', 'gojek', 'grab', 'ojek']):
-                kategori = 'Transportasi'
-            elif any(word in message_lower for word in ['hotel', 'karaoke', 'spa', 'pijat']):
-                kategori = 'Hiburan'
-            elif any(word in message_lower for word in ['rokok', 'parfum', 'hadiah', 'baju', 'sepatu']):
-                kategori = 'Pribadi'
-            elif any(word in message_lower for word in ['sabun', 'deterjen', 'tissue', 'rumah']):
-                kategori = 'Rumah Tangga'
-            elif any(word in message_lower for word in ['transfer', 'top up', 'kirim', 'tf']):
-                kategori = 'Keuangan'
-            else:
-                kategori = 'Lainnya'
+            kategori = 'Lainnya'
+            for cat, pattern in _CATEGORY_PATTERNS:
+                if pattern.search(message_text):
+                    kategori = cat
+                    break
             
             return {
                 'deskripsi': message_text,
@@ -296,23 +319,42 @@ Output: {
         """Check if service is healthy"""
         return self.health_status
     
-    def get_insights(self, transactions: list) -> str:
-        """Generate AI insights dari transaksi"""
+    def get_insights(self, transactions) -> str:
+        """
+        Generate AI insights dari transaksi
+        
+        Args:
+            transactions: List transaksi, atau ringkasan yang sudah dihitung
+                dengan key total_income, total_expense dan categories
+                
+        Returns:
+            Teks insights
+        """
         try:
             if not transactions:
                 return "📊 Belum ada data transaksi untuk dianalisis."
             
-            # Prepare data for analysis
-            total_income = sum(t.get('jumlah', 0) for t in transactions if t.get('tipe') == 'IN')
-            total_expense = sum(t.get('jumlah', 0) for t in transactions if t.get('tipe') == 'OUT')
-            
-            # Category analysis
-            categories = {}
-            for t in transactions:
-                cat = t.get('kategori', 'Lainnya')
-                categories[cat] = categories.get(cat, 0) + t.get('jumlah', 0)
+            if isinstance(transactions, dict):
+                # Pre-aggregated summary, no need to walk the rows again
+                total_income = transactions.get('total_income', 0)
+                total_expense = transactions.get('total_expense', 0)
+                categories = transactions.get('categories', {})
+            else:
+                # Totals and category analysis in a single pass
+                total_income = total_expense = 0
+                categories = {}
+                for t in transactions:
+                    jumlah = t.get('jumlah', 0)
+                    tipe = t.get('tipe')
+                    if tipe == 'IN':
+                        total_income += jumlah
+                    elif tipe == 'OUT':
+                        total_expense += jumlah
+                    
+                    cat = t.get('kategori', 'Lainnya')
+                    categories[cat] = categories.get(cat, 0) + jumlah
             
-            top_category = max(categories.items(), key=lambda x: x[1]) if categories else ('Tidak ada', 0)
+            top_category = max(categories.items(), key=lambda x: x[1], default=('Tidak ada', 0))
             
             insights = f"""🤖 **AI INSIGHTS**
 
@@ -341,6 +383,3 @@ Output: {
         except Exception as e:
             print(f"Error generating insights: {str(e)}")
             return "❌ Gagal membuat AI insights."
-
-# Import time untuk retry mechanism
-import time
@@ -5,15 +5,68 @@ Logger Service - Logging dan recovery system
 """
 
 import os
+import sys
 import json
+import mmap
 import time
+import queue
+import atexit
+import threading
 import traceback
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
+# Module-level aliases for the per-entry path
+_now = time.time
+_Event = threading.Event
+
+# Recent recovery entries per log directory, shared by every LoggerService in
+# the process so the scheduler's errors show up in main's summary
+_recent_errors_by_dir = {}
+_recent_errors_lock = threading.Lock()
+
+def _dumps_line(data: Dict[str, Any]) -> bytes:
+    """Serialize a recovery entry to one UTF-8 JSON line, using orjson when available"""
+    if orjson:
+        return orjson.dumps(data) + b'\n'
+    return (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8')
+
+def _loads(data):
+    """Parse JSON from bytes/str, using orjson when available"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _write_all(fd: int, parts: list) -> int:
+    """Append byte strings to a raw fd, one writev syscall in the common case"""
+    total = sum(map(len, parts))
+    if hasattr(os, 'writev'):
+        written = os.writev(fd, parts)
+    else:
+        written = os.write(fd, b''.join(parts))
+    
+    # Short write (e.g. disk nearly full): finish the remainder
+    if written < total:
+        data = memoryview(b''.join(parts))[written:]
+        while data:
+            data = data[os.write(fd, data):]
+    return total
+
+@lru_cache(maxsize=256)
+def _parse_timestamp(value: str) -> float:
+    """Parse a log timestamp to epoch seconds (cached, the same second repeats often)"""
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp()
+
 class LoggerService:
     def __init__(self):
         self.log_dir = "logs"
@@ -30,45 +83,211 @@ class LoggerService:
         self.warning_log = os.path.join(self.log_dir, "warning.log")
         self.debug_log = os.path.join(self.log_dir, "debug.log")
         
+        # Recovery log: append-only JSON lines, compacted to the last entries when it grows
+        self.recovery_file = os.path.join(self.log_dir, "recovery.jsonl")
+        self.max_recovery_entries = 100
+        self.max_recovery_size = 1024 * 1024  # 1MB
+        self.recovery_tail_bytes = 64 * 1024  # Tail read to prime the in-memory copy
+        self._migrate_recovery_file()
+        
+        # Last recovery entries kept in memory; the file is only the durable copy
+        with _recent_errors_lock:
+            key = os.path.abspath(self.log_dir)
+            if key not in _recent_errors_by_dir:
+                _recent_errors_by_dir[key] = deque(self._read_recovery_tail(), maxlen=self.max_recovery_entries)
+            self._recent_errors = _recent_errors_by_dir[key]
+        
+        # Lines in the recovery log, counted once here then on write
+        self._recovery_entries = 0
+        if os.path.exists(self.recovery_file):
+            with open(self.recovery_file, 'rb') as f:
+                self._recovery_entries = sum(1 for _ in f)
+        
+        # Level names pre-encoded for the bytes entry template
+        self._lvl_b = {level: level.encode('ascii') for level in ('INFO', 'ERROR', 'WARNING', 'DEBUG')}
+        
+        # Formatted timestamp, reused within the same second
+        self._ts_cache = (0, '')
+        
         # Error tracking
         self.error_count = 0
         self.last_error_time = None
         
+        # Background writer: log calls only enqueue, one thread does the file I/O
+        self.max_batch_size = 512  # Entries drained per batch (stays under IOV_MAX)
+        self._queue = queue.Queue(maxsize=10000)
+        self._put = self._queue.put_nowait  # Bound once, called per log entry
+        
+        # Persistent raw O_APPEND fds per log file, reused across writes
+        self._handles_lock = threading.Lock()
+        self._handles = {}
+        self._sizes = {}  # Bytes in each log file, seeded once then counted on write
+        for log_file in (self.info_log, self.error_log, self.warning_log, self.debug_log):
+            self._handles[log_file] = self._open_handle(log_file)
+        
         # Initialize
         self._cleanup_old_logs()
+        self._writer_thread = threading.Thread(target=self._drain, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
         self.log_info("🚀 Logger Service initialized")
     
     def _get_timestamp(self) -> str:
-        """Get formatted timestamp"""
-        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        """Get formatted timestamp (formatted at most once per second)"""
+        now = int(_now())
+        cached = self._ts_cache
+        if now != cached[0]:
+            cached = self._ts_cache = (now, datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S'))
+        return cached[1]
     
     def _write_log(self, log_file: str, level: str, message: str, exception: Optional[Exception] = None):
-        """Write log entry to file"""
+        """Queue a log entry for the writer thread"""
         try:
-            timestamp = self._get_timestamp()
-            log_entry = f"[{timestamp}] [{level}] {message}\n"
-            
+            # Traceback must be captured on the calling thread
+            exc_text = None
             if exception:
-                log_entry += f"Exception: {str(exception)}\n"
-                log_entry += f"Traceback: {traceback.format_exc()}\n"
+                # Only walk the traceback while an exception is actually being handled
+                exc_text = f"Exception: {str(exception)}\n"
+                if sys.exc_info()[0] is not None:
+                    exc_text += f"Traceback: {traceback.format_exc()}\n"
             
-            # Write to file
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-            
-            # Check file size and rotate if needed
-            self._rotate_log_if_needed(log_file)
+            self._put((log_file, self._get_timestamp(), level, message, exc_text))
             
+        except queue.Full:
+            print("Log queue full, dropping log entry")
         except Exception as e:
             print(f"Error writing to log file: {str(e)}")
     
+    def _drain(self):
+        """
+        Writer thread: drain the queue and append entries to their files in batches
+        
+        Queue items are entry tuples, a threading.Event to signal once
+        everything queued before it is written, or None to stop.
+        """
+        # Locals for the per-entry loop
+        get, get_nowait = self._queue.get, self._queue.get_nowait
+        lvl_b = self._lvl_b
+        max_batch_size = self.max_batch_size
+        
+        while True:
+            item = get()
+            
+            batches = {}
+            waiters = []
+            stop = False
+            count = 0
+            
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, _Event):
+                    waiters.append(item)
+                else:
+                    log_file, timestamp, level, message, exc_text = item
+                    if level is None:
+                        entry = message  # Pre-encoded line (recovery log)
+                    else:
+                        entry = b'[%s] [%s] %s\n' % (timestamp.encode('ascii'), lvl_b[level], message.encode('utf-8'))
+                        if exc_text:
+                            entry += exc_text.encode('utf-8')
+                    parts = batches.get(log_file)
+                    if parts is None:
+                        parts = batches[log_file] = []
+                    parts.append(entry)
+                    count += 1
+                
+                if stop or count >= max_batch_size:
+                    break
+                try:
+                    item = get_nowait()
+                except queue.Empty:
+                    break
+            
+            with self._handles_lock:
+                for log_file, parts in batches.items():
+                    try:
+                        # One writev per file per batch
+                        fd = self._current_handle(log_file)
+                        self._sizes[log_file] += _write_all(fd, parts)
+                        
+                        # Check file size and rotate/compact if needed (once per batch)
+                        if log_file == self.recovery_file:
+                            self._recovery_entries += len(parts)  # One JSON object per line
+                            self._compact_recovery_if_needed()
+                        else:
+                            self._rotate_log_if_needed(log_file)
+                        
+                    except Exception as e:
+                        print(f"Error writing to log file: {str(e)}")
+            
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                self._close_handles()
+                return
+    
+    def _open_handle(self, log_file: str):
+        """Open a raw append fd for a log file and seed its size counter"""
+        self._sizes[log_file] = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+        return os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    
+    def _current_handle(self, log_file: str):
+        """
+        Return the fd for log_file, reopening it if the path now points elsewhere
+        
+        Another LoggerService in the process or maintenance.py may have rotated
+        or removed the file; without this check entries would keep going to the
+        renamed or deleted inode.
+        """
+        fd = self._handles.get(log_file)
+        if fd is not None:
+            try:
+                if os.stat(log_file).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+        fd = self._handles[log_file] = self._open_handle(log_file)
+        return fd
+    
+    def _close_handles(self):
+        """Close every open log file"""
+        with self._handles_lock:
+            for fd in self._handles.values():
+                try:
+                    os.close(fd)
+                except Exception as e:
+                    print(f"Error closing log file: {str(e)}")
+            self._handles = {}
+    
+    def flush(self, timeout: float = 5):
+        """Wait until every log entry queued so far is written"""
+        if not self._writer_thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+    
+    def close(self):
+        """Flush pending log entries and stop the writer thread"""
+        if self._writer_thread.is_alive():
+            self._queue.put(None)
+            self._writer_thread.join(timeout=5)
+    
     def _rotate_log_if_needed(self, log_file: str):
         """Rotate log file if it's too large"""
         try:
-            if os.path.exists(log_file) and os.path.getsize(log_file) > self.max_log_size:
+            if self._sizes.get(log_file, 0) > self.max_log_size:
+                # Release the handle so the file can be renamed
+                fd = self._handles.pop(log_file, None)
+                if fd is not None:
+                    os.close(fd)
+                
                 # Create backup
                 backup_file = f"{log_file}.{int(time.time())}"
                 os.rename(log_file, backup_file)
+                self._handles[log_file] = self._open_handle(log_file)
                 
                 # Clean up old backups
                 self._cleanup_old_logs()
@@ -76,19 +295,84 @@ class LoggerService:
         except Exception as e:
             print(f"Error rotating log file: {str(e)}")
     
+    def _compact_recovery_if_needed(self):
+        """Trim the recovery log to its last entries once it passes max_recovery_size"""
+        try:
+            if self._sizes.get(self.recovery_file, 0) <= self.max_recovery_size:
+                return
+            
+            fd = self._handles.pop(self.recovery_file, None)
+            if fd is not None:
+                os.close(fd)
+            
+            with open(self.recovery_file, 'r', encoding='utf-8') as f:
+                lines = f.readlines()[-self.max_recovery_entries:]
+            
+            temp_file = f"{self.recovery_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            os.replace(temp_file, self.recovery_file)
+            self._recovery_entries = len(lines)
+            
+            self._handles[self.recovery_file] = self._open_handle(self.recovery_file)
+            
+        except Exception as e:
+            print(f"Error compacting recovery log: {str(e)}")
+    
+    def _migrate_recovery_file(self):
+        """Convert the old recovery.json list into recovery.jsonl once"""
+        old_file = os.path.join(self.log_dir, "recovery.json")
+        try:
+            if not os.path.exists(old_file) or os.path.exists(self.recovery_file):
+                return
+            
+            with open(old_file, 'rb') as f:
+                errors = _loads(f.read())
+            with open(self.recovery_file, 'wb') as f:
+                for error in errors[-self.max_recovery_entries:]:
+                    f.write(_dumps_line(error))
+            os.remove(old_file)
+            
+        except Exception as e:
+            print(f"Error migrating recovery file: {str(e)}")
+    
+    def _read_recovery_tail(self) -> list:
+        """Parse the last recovery entries from the tail of the file"""
+        errors = []
+        try:
+            if not os.path.exists(self.recovery_file):
+                return errors
+            
+            # Only read the tail of the file; the first line may be cut, skip it if so
+            with open(self.recovery_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+                f.seek(max(0, end - self.recovery_tail_bytes))
+                tail = f.read().splitlines()[-self.max_recovery_entries:]
+            
+            for line in tail:
+                try:
+                    errors.append(_loads(line))
+                except ValueError:
+                    pass
+                    
+        except Exception as e:
+            print(f"Error reading recovery log: {str(e)}")
+        return errors
+    
     def _cleanup_old_logs(self):
         """Clean up old log files"""
         try:
-            log_files = []
-            for file in os.listdir(self.log_dir):
-                if file.endswith('.log') or file.endswith('.log.'):
-                    log_files.append(os.path.join(self.log_dir, file))
+            # scandir entries carry their stat info, no extra getmtime per file
+            with os.scandir(self.log_dir) as it:
+                log_files = [(entry.path, entry.stat().st_mtime) for entry in it
+                             if entry.name.endswith('.log') or entry.name.endswith('.log.')]
             
             # Sort by modification time
-            log_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
+            log_files.sort(key=lambda x: x[1], reverse=True)
             
             # Keep only max_log_files
-            for old_file in log_files[self.max_log_files:]:
+            for old_file, _ in log_files[self.max_log_files:]:
                 try:
                     os.remove(old_file)
                 except:
@@ -127,67 +411,47 @@ class LoggerService:
         """Save error information for recovery analysis"""
         try:
             error_data = {
-                'timestamp': self._get_timestamp(),
+                'timestamp': self._get_timestamp(),  # For display
+                'epoch': int(time.time()),  # For comparisons, no strptime needed
                 'message': message,
                 'exception': str(exception) if exception else None,
-                'traceback': traceback.format_exc() if exception else None,
+                'traceback': traceback.format_exc() if (exception and sys.exc_info()[0] is not None) else None,
                 'error_count': self.error_count
             }
             
-            recovery_file = os.path.join(self.log_dir, "recovery.json")
-            
-            # Load existing errors
-            errors = []
-            if os.path.exists(recovery_file):
-                try:
-                    with open(recovery_file, 'r', encoding='utf-8') as f:
-                        errors = json.load(f)
-                except:
-                    errors = []
-            
-            # Add new error
-            errors.append(error_data)
+            self._recent_errors.append(error_data)
             
-            # Keep only last 100 errors
-            if len(errors) > 100:
-                errors = errors[-100:]
+            # Append one JSON line via the writer thread (compacted there)
+            line = _dumps_line(error_data)
+            self._put((self.recovery_file, None, None, line, None))
             
-            # Save back
-            with open(recovery_file, 'w', encoding='utf-8') as f:
-                json.dump(errors, f, indent=2, ensure_ascii=False)
-                
+        except queue.Full:
+            print("Log queue full, dropping recovery entry")
         except Exception as e:
             print(f"Error saving error for recovery: {str(e)}")
     
     def get_error_summary(self) -> Dict[str, Any]:
         """Get error summary for monitoring"""
         try:
-            recovery_file = os.path.join(self.log_dir, "recovery.json")
-            
-            if not os.path.exists(recovery_file):
-                return {
-                    'total_errors': 0,
-                    'recent_errors': [],
-                    'last_error_time': None
-                }
-            
-            with open(recovery_file, 'r', encoding='utf-8') as f:
-                errors = json.load(f)
+            # Served from memory, no disk access
+            errors = list(self._recent_errors)[-10:]
             
             # Get recent errors (last 24 hours)
             recent_errors = []
-            cutoff_time = datetime.now().timestamp() - (24 * 60 * 60)
+            cutoff_time = time.time() - (24 * 60 * 60)
             
-            for error in errors[-10:]:  # Last 10 errors
+            for error in errors:  # Last 10 errors
                 try:
-                    error_time = datetime.strptime(error['timestamp'], '%Y-%m-%d %H:%M:%S').timestamp()
+                    error_time = error.get('epoch')
+                    if error_time is None:  # Entries written before the epoch field
+                        error_time = _parse_timestamp(error['timestamp'])
                     if error_time > cutoff_time:
                         recent_errors.append(error)
                 except:
                     pass
             
             return {
-                'total_errors': len(errors),
+                'total_errors': min(self._recovery_entries, self.max_recovery_entries),
                 'recent_errors': recent_errors,
                 'last_error_time': self.last_error_time.isoformat() if self.last_error_time else None,
                 'error_count': self.error_count
@@ -206,6 +470,7 @@ class LoggerService:
         """Get log file statistics"""
         try:
             stats = {}
+            self.flush()
             
             for log_type in ['info', 'error', 'warning', 'debug']:
                 log_file = getattr(self, f"{log_type}_log")
@@ -243,10 +508,16 @@ class LoggerService:
                 log_file = getattr(self, f"{log_type}_log", None)
                 log_files = [log_file] if log_file else []
             
-            for log_file in log_files:
-                if os.path.exists(log_file):
-                    with open(log_file, 'w', encoding='utf-8') as f:
-                        f.write("")
+            self.flush()
+            with self._handles_lock:
+                for log_file in log_files:
+                    fd = self._handles.get(log_file)
+                    if fd is not None:
+                        os.ftruncate(fd, 0)
+                        self._sizes[log_file] = 0
+                    elif os.path.exists(log_file):
+                        with open(log_file, 'w', encoding='utf-8') as f:
+                            f.write("")
             
             self.log_info(f"Cleared {log_type} logs")
             
@@ -260,21 +531,25 @@ class LoggerService:
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 output_file = os.path.join(self.log_dir, f"exported_logs_{timestamp}.txt")
             
-            with open(output_file, 'w', encoding='utf-8') as outfile:
-                outfile.write("=== BOS UPETY BOT LOGS EXPORT ===\n")
-                outfile.write(f"Export Date: {self._get_timestamp()}\n\n")
+            self.flush()
+            with open(output_file, 'wb') as outfile:
+                outfile.write("=== BOS UPETY BOT LOGS EXPORT ===\n".encode('utf-8'))
+                outfile.write(f"Export Date: {self._get_timestamp()}\n\n".encode('utf-8'))
                 
                 # Export each log type
                 for log_type in ['info', 'error', 'warning', 'debug']:
                     log_file = getattr(self, f"{log_type}_log")
                     
                     if os.path.exists(log_file):
-                        outfile.write(f"=== {log_type.upper()} LOGS ===\n")
+                        outfile.write(f"=== {log_type.upper()} LOGS ===\n".encode('utf-8'))
                         
-                        with open(log_file, 'r', encoding='utf-8') as infile:
-                            outfile.write(infile.read())
+                        # Copy straight from the mapped file, no intermediate string
+                        with open(log_file, 'rb') as infile:
+                            if os.fstat(infile.fileno()).st_size:
+                                with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                                    outfile.write(mm)
                         
-                        outfile.write("\n\n")
+                        outfile.write(b"\n\n")
             
             self.log_info(f"Logs exported to: {output_file}")
             return output_file
@@ -364,7 +639,7 @@ class LoggerService:
             error_summary = health_data['error_summary']
             log_stats = health_data['log_stats']
             
-            report = f"""🏥 **SYSTEM HEALTH REPORT**
+            parts = [f"""🏥 **SYSTEM HEALTH REPORT**
 
 📅 {self._get_timestamp()}
 
@@ -377,20 +652,20 @@ class LoggerService:
 • Last Error: {error_summary['last_error_time'] or 'None'}
 
 📁 **LOG STATS:**
-"""
+"""]
             
             for log_type, stats in log_stats.items():
                 status_emoji = "✅" if stats['exists'] else "❌"
-                report += f"• {log_type.title()}: {status_emoji} {stats['size_mb']}MB\n"
+                parts.append(f"• {log_type.title()}: {status_emoji} {stats['size_mb']}MB\n")
             
-            report += f"""
+            parts.append("""
 💡 **RECOMMENDATIONS:**
-"""
+""")
             
             for rec in health_data['recommendations']:
-                report += f"• {rec}\n"
+                parts.append(f"• {rec}\n")
             
-            return report
+            return ''.join(parts)
             
         except Exception as e:
             self.log_error(f"Error creating health report: {str(e)}")
@@ -6,13 +6,26 @@ Main webhook handler untuk menerima pesan dari Fonnte API
 """
 
 import os
+import re
 import sys
 import json
 import time
+import signal
 import threading
+import itertools
+import functools
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import custom services
 from gemini_service import GeminiService
@@ -34,32 +47,76 @@ drive = DriveService()
 logger = LoggerService()
 backup = BackupService()
 
+# Pesan diproses di thread terpisah supaya webhook langsung membalas Fonnte
+message_pool = ThreadPoolExecutor(max_workers=8)
+balance_lock = threading.Lock()  # Lindungi update saldo antar thread
+
+# Di-set saat bot berhenti supaya thread background keluar dengan cepat
+shutdown_event = threading.Event()
+RESTART_CHECK_INTERVAL = 30  # Detik antar cek error count
+
 # Configuration
 FONNTE_TOKEN = os.getenv('FONNTE_TOKEN')
 ADMIN_NUMBER = os.getenv('ADMIN', '6282181151735')
 BOS_NUMBER = os.getenv('BOS', '628115302098')
 ALLOWED_NUMBERS = [ADMIN_NUMBER, BOS_NUMBER]
 
+# Pooled session untuk Fonnte, koneksi TLS dipakai ulang antar pesan
+fonnte_session = requests.Session()
+fonnte_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+fonnte_session.headers.update({'Authorization': FONNTE_TOKEN or ''})
+
+# Bagian /status yang tidak pernah berubah
+STATUS_STATIC = {
+    'bot_name': 'Bos Upety Bot PRO 24/7',
+    'status': 'active',
+    'allowed_numbers': ALLOWED_NUMBERS,
+}
+
+# Kata kunci perintah khusus, dicari sekali per pesan (substring, seperti sebelumnya)
+COMMAND_RE = re.compile(r'laporan|saldo|help|bantuan', re.IGNORECASE)
+
+# Teks bantuan statis, dibangun sekali saat modul dimuat
+HELP_TEXT = """🤖 **BOS UPETY BOT PRO 24/7**
+
+📋 **Cara Penggunaan:**
+• Kirim transaksi: "beli rokok 25000"
+• Kirim foto nota untuk bukti
+• Ketik "laporan" untuk laporan harian
+• Ketik "saldo" untuk cek saldo
+
+⏰ **Jadwal Otomatis:**
+• 23:50 - Laporan harian
+• 06:00 - Reminder saldo
+• 00:00 - Laporan performa sistem
+
+🔄 **Status:** Aktif 24/7"""
+
 # Global variables
 current_balance = 0
 transaction_count = 0
 error_count = 0
+saldo_cache = (None, '')  # ((saldo, menit), teks balasan)
+
+# Counter hanya naik: next() pada itertools.count atomic, tanpa lock
+tx_counter = itertools.count(1)
+error_counter = itertools.count(1)
+
+@functools.lru_cache(maxsize=1)
+def _now_str(sec):
+    """Timestamp transaksi, diformat sekali per detik"""
+    return datetime.fromtimestamp(sec).strftime('%Y-%m-%d %H:%M:%S')
 
 def send_whatsapp_message(phone, message):
     """Kirim pesan WhatsApp via Fonnte API"""
     try:
-        import requests
-        
         url = "https://api.fonnte.com/send"
-        headers = {
-            'Authorization': FONNTE_TOKEN
-        }
         data = {
             'target': phone,
             'message': message
         }
         
-        response = requests.post(url, headers=headers, data=data, timeout=10)
+        response = fonnte_session.post(url, data=data, timeout=10)
         
         if response.status_code == 200:
             logger.log_info(f"Pesan berhasil dikirim ke {phone}")
@@ -85,7 +142,7 @@ def process_transaction(message_text, sender_phone, media_url=None):
         
         # Simpan ke Google Sheets
         transaction_data = {
-            'tanggal': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'tanggal': _now_str(int(time.time())),
             'deskripsi': ai_result.get('deskripsi', ''),
             'jumlah': ai_result.get('jumlah', 0),
             'tipe': ai_result.get('tipe', 'INFO'),
@@ -96,18 +153,19 @@ def process_transaction(message_text, sender_phone, media_url=None):
         }
         
         # Update saldo
-        if ai_result.get('tipe') == 'IN':
-            current_balance += ai_result.get('jumlah', 0)
-        elif ai_result.get('tipe') == 'OUT':
-            current_balance -= ai_result.get('jumlah', 0)
-        
-        transaction_data['saldo'] = current_balance
+        with balance_lock:
+            if ai_result.get('tipe') == 'IN':
+                current_balance += ai_result.get('jumlah', 0)
+            elif ai_result.get('tipe') == 'OUT':
+                current_balance -= ai_result.get('jumlah', 0)
+            
+            transaction_data['saldo'] = current_balance
         
         # Simpan ke Sheets
         success = sheets.save_transaction(transaction_data)
         
         if success:
-            transaction_count += 1
+            transaction_count = next(tx_counter)
             # Backup ke CSV
             backup.save_transaction(transaction_data)
             
@@ -121,33 +179,30 @@ def process_transaction(message_text, sender_phone, media_url=None):
 
 def handle_special_commands(message_text, sender_phone):
     """Handle perintah khusus dari bos/admin"""
-    global current_balance
-    
-    message_lower = message_text.lower()
-    
-    if 'laporan hari ini' in message_lower or 'laporan' in message_lower:
-        return generate_daily_report()
+    found = {match.lower() for match in COMMAND_RE.findall(message_text)}
+    if not found:
+        return None
     
-    elif 'saldo' in message_lower:
-        return f"💰 **SALDO TERKINI**\n\n💵 Rp {current_balance:,}\n📅 {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+    # Urutan COMMAND_HANDLERS = prioritas (laporan > saldo > help)
+    for command, handler in COMMAND_HANDLERS.items():
+        if command in found:
+            return handler()
     
-    elif 'help' in message_lower or 'bantuan' in message_lower:
-        return """🤖 **BOS UPETY BOT PRO 24/7**
-
-📋 **Cara Penggunaan:**
-• Kirim transaksi: "beli rokok 25000"
-• Kirim foto nota untuk bukti
-• Ketik "laporan" untuk laporan harian
-• Ketik "saldo" untuk cek saldo
-
-⏰ **Jadwal Otomatis:**
-• 23:50 - Laporan harian
-• 06:00 - Reminder saldo
-• 00:00 - Laporan performa sistem
+    return None
 
-🔄 **Status:** Aktif 24/7"""
+def saldo_reply():
+    """Balasan perintah saldo (diformat ulang hanya jika saldo/menit berubah)"""
+    global saldo_cache
     
-    return None
+    key = (current_balance, datetime.now().strftime('%d/%m/%Y %H:%M'))
+    cached = saldo_cache
+    if cached[0] != key:
+        cached = saldo_cache = (key, f"💰 **SALDO TERKINI**\n\n💵 Rp {key[0]:,}\n📅 {key[1]}")
+    return cached[1]
+
+def help_reply():
+    """Balasan perintah help/bantuan"""
+    return HELP_TEXT
 
 def generate_daily_report():
     """Generate laporan harian"""
@@ -158,8 +213,16 @@ def generate_daily_report():
         if not transactions:
             return f"📊 **LAPORAN HARIAN**\n\n📅 {today}\n💰 Saldo: Rp {current_balance:,}\n📝 Tidak ada transaksi hari ini"
         
-        total_income = sum(t.get('jumlah', 0) for t in transactions if t.get('tipe') == 'IN')
-        total_expense = sum(t.get('jumlah', 0) for t in transactions if t.get('tipe') == 'OUT')
+        # Satu kali loop: total masuk/keluar sekaligus 5 transaksi terakhir
+        total_income = total_expense = 0
+        last_five = deque(maxlen=5)
+        for t in transactions:
+            tipe = t.get('tipe')
+            if tipe == 'IN':
+                total_income += t.get('jumlah', 0)
+            elif tipe == 'OUT':
+                total_expense += t.get('jumlah', 0)
+            last_five.append(t)
         
         report = f"""📊 **LAPORAN HARIAN**
         
@@ -174,7 +237,7 @@ def generate_daily_report():
 """
         
         # Tampilkan 5 transaksi terakhir
-        for i, trans in enumerate(transactions[-5:], 1):
+        for i, trans in enumerate(last_five, 1):
             emoji = "📈" if trans.get('tipe') == 'IN' else "📉"
             report += f"{i}. {emoji} {trans.get('deskripsi', '')} - Rp {trans.get('jumlah', 0):,}\n"
         
@@ -184,13 +247,48 @@ def generate_daily_report():
         logger.log_error(f"Error generate laporan: {str(e)}")
         return "❌ Gagal membuat laporan. Coba lagi."
 
+# Handler perintah khusus, urut sesuai prioritas
+COMMAND_HANDLERS = {
+    'laporan': generate_daily_report,
+    'saldo': saldo_reply,
+    'help': help_reply,
+    'bantuan': help_reply,
+}
+
+def _handle_message(sender_phone, message_text, media_url=None):
+    """Proses pesan dan kirim balasan (jalan di message_pool)"""
+    global error_count
+    
+    try:
+        # Handle perintah khusus
+        special_response = handle_special_commands(message_text, sender_phone)
+        if special_response:
+            send_whatsapp_message(sender_phone, special_response)
+            return
+        
+        # Proses transaksi
+        if message_text.strip():
+            response = process_transaction(message_text, sender_phone, media_url)
+            send_whatsapp_message(sender_phone, response)
+            
+    except Exception as e:
+        error_count = next(error_counter)
+        logger.log_error(f"Error proses pesan: {str(e)}")
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """Webhook utama untuk menerima pesan dari Fonnte"""
     global error_count
     
     try:
-        data = request.get_json()
+        # Parse body langsung (orjson jika tersedia)
+        raw = request.get_data()
+        if not raw:
+            data = None
+        elif orjson:
+            data = orjson.loads(raw)
+        else:
+            data = json.loads(raw)
         
         if not data:
             return jsonify({'status': 'error', 'message': 'No data received'}), 400
@@ -208,21 +306,12 @@ def webhook():
             send_whatsapp_message(sender_phone, "❌ Akses ditolak. Nomor tidak terdaftar.")
             return jsonify({'status': 'rejected'}), 403
         
-        # Handle perintah khusus
-        special_response = handle_special_commands(message_text, sender_phone)
-        if special_response:
-            send_whatsapp_message(sender_phone, special_response)
-            return jsonify({'status': 'success'})
-        
-        # Proses transaksi
-        if message_text.strip():
-            response = process_transaction(message_text, sender_phone, media_url)
-            send_whatsapp_message(sender_phone, response)
-        
-        return jsonify({'status': 'success'})
+        # Balas Fonnte dulu, pesan diproses di background
+        message_pool.submit(_handle_message, sender_phone, message_text, media_url)
+        return jsonify({'status': 'queued'})
         
     except Exception as e:
-        error_count += 1
+        error_count = next(error_counter)
         logger.log_error(f"Error webhook: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -240,14 +329,13 @@ def ping():
 @app.route('/status', methods=['GET'])
 def status():
     """Status endpoint untuk monitoring"""
+    # is_healthy() hanya membaca flag yang di-update oleh service, tanpa request jaringan
     return jsonify({
-        'bot_name': 'Bos Upety Bot PRO 24/7',
-        'status': 'active',
+        **STATUS_STATIC,
         'uptime': time.time(),
         'current_balance': current_balance,
         'total_transactions': transaction_count,
         'error_count': error_count,
-        'allowed_numbers': ALLOWED_NUMBERS,
         'services': {
             'gemini': gemini.is_healthy(),
             'sheets': sheets.is_healthy(),
@@ -258,17 +346,25 @@ def status():
 def auto_restart_on_error():
     """Auto restart jika terjadi error fatal"""
     try:
-        while True:
-            time.sleep(300)  # Check setiap 5 menit
-            
+        # wait() langsung kembali True begitu shutdown_event di-set
+        while not shutdown_event.wait(timeout=RESTART_CHECK_INTERVAL):
             # Jika error count terlalu tinggi, restart
             if error_count > 50:
                 logger.log_error("Error count terlalu tinggi, melakukan restart...")
+                logger.flush()  # execv tidak menjalankan atexit
+                sheets.close()  # Sisa baris yang gagal disimpan ke pending file
+                backup.flush()
                 os.execv(sys.executable, ['python'] + sys.argv)
                 
     except Exception as e:
         logger.log_error(f"Error di auto restart: {str(e)}")
 
+def handle_sigterm(signum, frame):
+    """Hentikan bot dengan rapi saat menerima SIGTERM"""
+    shutdown_event.set()
+    logger.log_info("🛑 SIGTERM diterima, bot berhenti...")
+    sys.exit(0)
+
 def main():
     """Main function"""
     try:
@@ -278,6 +374,10 @@ def main():
         scheduler = SchedulerService()
         scheduler.start()
         
+        # Shutdown cepat saat SIGTERM (signal hanya bisa dipasang dari main thread)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, handle_sigterm)
+        
         # Start auto restart thread
         restart_thread = threading.Thread(target=auto_restart_on_error, daemon=True)
         restart_thread.start()
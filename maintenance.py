@@ -6,12 +6,19 @@ Script untuk maintenance, cleanup, dan optimasi sistem
 """
 
 import os
+import re
 import json
 import time
 import shutil
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import services
 from logger_service import LoggerService
 from backup_service import BackupService
@@ -20,6 +27,22 @@ from drive_service import DriveService
 
 load_dotenv()
 
+# Files that are never written again once created: rotated logs and full/restore backups
+_IMMUTABLE_RE = re.compile(r'^(full_backup_|restore_backup_)')
+
+def _link_or_copy(src, dst):
+    """copytree copy_function: hard-link immutable files, copy live ones"""
+    # Live files (logs, transactions.csv, indexes) keep being appended or
+    # truncated in place, so a hard link would not be a snapshot. Rotated logs
+    # count as live: a writer may still hold the old fd until it notices
+    if _IMMUTABLE_RE.search(os.path.basename(src)):
+        try:
+            os.link(src, dst)
+            return dst
+        except OSError:
+            pass  # Cross-device or links not supported
+    return shutil.copy2(src, dst)
+
 class BotMaintenance:
     def __init__(self):
         self.logger = LoggerService()
@@ -32,6 +55,14 @@ class BotMaintenance:
         self.max_backup_age_days = 90
         self.max_drive_files = 1000
         self.cleanup_threshold_mb = 100  # Cleanup if logs > 100MB
+        
+        # Disk usage changes slowly: reuse a statvfs result for disk_cache_ttl seconds
+        self._disk_path = os.path.abspath(os.getcwd())  # Resolved once
+        self.disk_cache_ttl = 60
+        self._disk_cache = (0.0, None)
+        
+        # Large log rotations run in the background, off the maintenance thread
+        self._rot_pool = ThreadPoolExecutor(max_workers=1)
     
     def cleanup_logs(self):
         """Clean up old log files"""
@@ -43,23 +74,29 @@ class BotMaintenance:
                 print("   No logs directory found")
                 return 0
             
-            cleaned_count = 0
-            cutoff_date = datetime.now() - timedelta(days=self.max_log_age_days)
-            
-            for file in os.listdir(log_dir):
-                file_path = os.path.join(log_dir, file)
-                
-                if os.path.isfile(file_path):
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    
-                    if file_mtime < cutoff_date:
-                        try:
-                            os.remove(file_path)
-                            cleaned_count += 1
-                            print(f"   Removed: {file}")
-                        except Exception as e:
-                            print(f"   Error removing {file}: {str(e)}")
-            
+            cutoff_ts = time.time() - self.max_log_age_days * 86400
+            
+            # scandir entries carry cached type/stat info, no extra stat per file
+            with os.scandir(log_dir) as it:
+                old_files = [entry for entry in it
+                             if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff_ts]
+            
+            # Tight unlink loop; failures are only recorded, formatted afterwards
+            failed = []
+            for entry in old_files:
+                try:
+                    os.unlink(entry.path)
+                except OSError as e:
+                    failed.append((entry.name, e))
+            cleaned_count = len(old_files) - len(failed)
+            
+            # One summary instead of a print per file
+            if cleaned_count:
+                failed_names = {name for name, _ in failed}
+                removed = [entry.name for entry in old_files if entry.name not in failed_names]
+                print(f"   Removed: {', '.join(removed[:10])}{'...' if len(removed) > 10 else ''}")
+            for name, error in failed:
+                print(f"   Error removing {name}: {str(error)}")
             print(f"✅ Cleaned up {cleaned_count} old log files")
             return cleaned_count
             
@@ -108,25 +145,25 @@ class BotMaintenance:
                 return 0
             
             optimized_count = 0
+            rotated = []
+            
+            with os.scandir(log_dir) as it:
+                entries = [entry for entry in it if entry.name.endswith('.log')]
             
-            for file in os.listdir(log_dir):
-                if file.endswith('.log'):
-                    file_path = os.path.join(log_dir, file)
-                    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+            for entry in entries:
+                file_size_mb = entry.stat().st_size / (1024 * 1024)
+                
+                if file_size_mb > 10:  # If log file > 10MB
+                    # Rotate the log file in the background (entry.path is already joined)
+                    timestamp = int(time.time())
+                    self._rot_pool.submit(self._rotate_one, entry.path, f"{entry.path}.{timestamp}")
                     
-                    if file_size_mb > 10:  # If log file > 10MB
-                        # Rotate the log file
-                        timestamp = int(time.time())
-                        new_name = f"{file}.{timestamp}"
-                        shutil.move(file_path, os.path.join(log_dir, new_name))
-                        
-                        # Create new empty log file
-                        with open(file_path, 'w') as f:
-                            f.write("")
-                        
-                        optimized_count += 1
-                        print(f"   Rotated: {file} ({file_size_mb:.1f}MB)")
+                    optimized_count += 1
+                    rotated.append(f"{entry.name} ({file_size_mb:.1f}MB)")
             
+            # One summary line instead of a print per file
+            if rotated:
+                print(f"   Rotating: {', '.join(rotated[:10])}{'...' if len(rotated) > 10 else ''}")
             print(f"✅ Optimized {optimized_count} log files")
             return optimized_count
             
@@ -134,13 +171,30 @@ class BotMaintenance:
             print(f"❌ Error optimizing logs: {str(e)}")
             return 0
     
+    def _rotate_one(self, file_path, new_path):
+        """Move a log file aside and start a new empty one (runs on _rot_pool)"""
+        try:
+            # Same directory, so a plain rename is one atomic syscall
+            os.rename(file_path, new_path)
+            
+            # Create new empty log file; the name is free after the rename, and if
+            # a writer already recreated it, keep its entries instead of truncating
+            try:
+                os.close(os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            except FileExistsError:
+                pass
+                
+        except Exception as e:
+            print(f"❌ Error rotating {file_path}: {str(e)}")
+    
     def backup_system_data(self):
         """Create system data backup"""
         try:
             print("💾 Creating system data backup...")
             
             # Create backup directory with timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            now = datetime.now()
+            timestamp = now.strftime('%Y%m%d_%H%M%S')
             backup_dir = f"system_backup_{timestamp}"
             
             if not os.path.exists(backup_dir):
@@ -153,25 +207,37 @@ class BotMaintenance:
                 'config.env'
             ]
             
+            # Wait for queued log rotations (single worker, FIFO) so logs/ is stable
+            self._rot_pool.submit(lambda: None).result()
+            
+            # Copy independent trees in parallel so their disk I/O overlaps
+            tasks = [
+                (self._copy_tree if os.path.isdir(item) else shutil.copy2, item, os.path.join(backup_dir, item))
+                for item in files_to_backup if os.path.exists(item)
+            ]
+            
             backed_up = 0
-            for item in files_to_backup:
-                if os.path.exists(item):
-                    if os.path.isdir(item):
-                        shutil.copytree(item, os.path.join(backup_dir, item))
-                    else:
-                        shutil.copy2(item, os.path.join(backup_dir, item))
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(copy_fn, src, dst) for copy_fn, src, dst in tasks]
+                for future in futures:
+                    future.result()  # Re-raise copy errors
                     backed_up += 1
             
             # Create backup info
             backup_info = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'backup_type': 'system_maintenance',
                 'files_backed_up': backed_up,
                 'backup_size_mb': self._get_dir_size_mb(backup_dir)
             }
             
-            with open(os.path.join(backup_dir, 'backup_info.json'), 'w') as f:
-                json.dump(backup_info, f, indent=2)
+            info_path = os.path.join(backup_dir, 'backup_info.json')
+            if orjson:
+                with open(info_path, 'wb') as f:
+                    f.write(orjson.dumps(backup_info, option=orjson.OPT_INDENT_2))
+            else:
+                with open(info_path, 'w') as f:
+                    json.dump(backup_info, f, indent=2)
             
             print(f"✅ System backup created: {backup_dir}")
             return backup_dir
@@ -180,13 +246,23 @@ class BotMaintenance:
             print(f"❌ Error creating system backup: {str(e)}")
             return None
     
+    def _copy_tree(self, src, dst):
+        """Copy a directory, hard-linking files that can't change any more"""
+        return shutil.copytree(src, dst, copy_function=_link_or_copy)
+    
     def _get_dir_size_mb(self, directory):
         """Get directory size in MB"""
         try:
+            # Iterative scandir walk: sizes come from the cached DirEntry stat
             total_size = 0
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    total_size += os.path.getsize(os.path.join(root, file))
+            stack = [directory]
+            while stack:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total_size += entry.stat(follow_symlinks=False).st_size
             return round(total_size / (1024 * 1024), 2)
         except:
             return 0
@@ -196,8 +272,13 @@ class BotMaintenance:
         try:
             print("💽 Checking disk space...")
             
-            # Get current directory disk usage
-            total, used, free = shutil.disk_usage('.')
+            # Get current directory disk usage (cached)
+            now = time.monotonic()
+            cached_at, usage = self._disk_cache
+            if usage is None or now - cached_at >= self.disk_cache_ttl:
+                usage = shutil.disk_usage(self._disk_path)
+                self._disk_cache = (now, usage)
+            total, used, free = usage
             
             total_gb = total / (1024**3)
             used_gb = used / (1024**3)
@@ -251,12 +332,13 @@ class BotMaintenance:
     def run_full_maintenance(self):
         """Run full maintenance cycle"""
         try:
+            now = datetime.now()
             print("🔧 Bos Upety Bot PRO 24/7 - Full Maintenance")
-            print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"📅 {now.strftime('%Y-%m-%d %H:%M:%S')}")
             print("=" * 60)
             
             results = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'logs_cleaned': 0,
                 'backups_cleaned': 0,
                 'drive_files_cleaned': 0,
@@ -269,10 +351,12 @@ class BotMaintenance:
             # Check disk space first
             results['disk_space_ok'] = self.check_disk_space()
             
-            # Cleanup operations
-            results['logs_cleaned'] = self.cleanup_logs()
-            results['backups_cleaned'] = self.cleanup_backups()
-            results['drive_files_cleaned'] = self.cleanup_drive_files()
+            # Cleanup operations (Drive cleanup is network-bound, run it alongside the local ones)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                drive_future = executor.submit(self.cleanup_drive_files)
+                results['logs_cleaned'] = self.cleanup_logs()
+                results['backups_cleaned'] = self.cleanup_backups()
+                results['drive_files_cleaned'] = drive_future.result()
             
             # Optimization operations
             results['logs_optimized'] = self.optimize_logs()
@@ -305,8 +389,9 @@ class BotMaintenance:
     def run_quick_maintenance(self):
         """Run quick maintenance (cleanup only)"""
         try:
+            now = datetime.now()
             print("⚡ Quick Maintenance - Cleanup Only")
-            print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"📅 {now.strftime('%Y-%m-%d %H:%M:%S')}")
             print("=" * 40)
             
             # Quick cleanup
@@ -320,7 +405,7 @@ class BotMaintenance:
             return {
                 'logs_cleaned': logs_cleaned,
                 'backups_cleaned': backups_cleaned,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now.isoformat()
             }
             
         except Exception as e:
@@ -340,6 +425,9 @@ def main():
         maintenance = BotMaintenance()
         result = maintenance.run_full_maintenance()
     
+    # Let background log rotations finish before exiting
+    maintenance._rot_pool.shutdown(wait=True)
+    
     if result:
         print("\n🎉 Maintenance completed successfully!")
     else:
@@ -9,8 +9,10 @@ import os
 import json
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 # Import services
 from logger_service import LoggerService
@@ -33,11 +35,25 @@ class BotMonitor:
         self.bot_url = os.getenv('BOT_URL', 'http://localhost:5000')
         self.admin_number = os.getenv('ADMIN', '6282181151735')
         self.bos_number = os.getenv('BOS', '628115302098')
+        
+        # Fonnte settings, read once
+        self.fonnte_token = os.getenv('FONNTE_TOKEN')
+        self.fonnte_url = "https://api.fonnte.com/send"
+        self.fonnte_headers = {'Authorization': self.fonnte_token} if self.fonnte_token else None
+        
+        # Keep-alive session shared by the bot ping and Fonnte alerts
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Independent I/O-bound checks run concurrently
+        self.executor = ThreadPoolExecutor(max_workers=5)
     
     def check_bot_health(self):
         """Check bot health via ping endpoint"""
         try:
-            response = requests.get(f"{self.bot_url}/ping", timeout=10)
+            response = self.session.get(f"{self.bot_url}/ping", timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -62,6 +78,7 @@ class BotMonitor:
     
     def check_services_health(self):
         """Check health of all services"""
+        # is_healthy() only reads a flag, no point in a thread per call
         services = {
             'Google Sheets': self.sheets.is_healthy(),
             'Gemini AI': self.gemini.is_healthy(),
@@ -75,45 +92,44 @@ class BotMonitor:
     def get_system_stats(self):
         """Get system statistics"""
         try:
-            # Get backup info
-            backup_info = self.backup.get_backup_info()
-            
-            # Get log stats
-            log_stats = self.logger.get_log_stats()
-            
-            # Get error summary
-            error_summary = self.logger.get_error_summary()
-            
-            # Get sheets info
-            sheets_info = self.sheets.get_sheet_info()
-            
-            # Get drive info
-            drive_info = self.drive.get_folder_info()
-            
-            return {
-                'backup': backup_info,
-                'logs': log_stats,
-                'errors': error_summary,
-                'sheets': sheets_info,
-                'drive': drive_info,
-                'timestamp': datetime.now().isoformat()
+            # Backup, log, error, sheets and drive info are independent: fetch concurrently
+            futures = {
+                'backup': self.executor.submit(self.backup.get_backup_info),
+                'logs': self.executor.submit(self.logger.get_log_stats),
+                'errors': self.executor.submit(self.logger.get_error_summary),
+                'sheets': self.executor.submit(self.sheets.get_sheet_info),
+                'drive': self.executor.submit(self.drive.get_folder_info),
             }
             
+            stats = {name: future.result() for name, future in futures.items()}
+            stats['timestamp'] = datetime.now().isoformat()
+            return stats
+            
         except Exception as e:
             self.logger.log_error(f"Error getting system stats: {str(e)}")
             return {}
     
-    def generate_health_report(self):
-        """Generate comprehensive health report"""
+    def generate_health_report(self, bot_health=None, services_health=None, system_stats=None):
+        """
+        Generate comprehensive health report
+        
+        Args:
+            bot_health: Result of check_bot_health(), fetched if None
+            services_health: Result of check_services_health(), fetched if None
+            system_stats: Result of get_system_stats(), fetched if None
+        """
         try:
             # Check bot health
-            bot_health = self.check_bot_health()
+            if bot_health is None:
+                bot_health = self.check_bot_health()
             
             # Check services health
-            services_health = self.check_services_health()
+            if services_health is None:
+                services_health = self.check_services_health()
             
             # Get system stats
-            system_stats = self.get_system_stats()
+            if system_stats is None:
+                system_stats = self.get_system_stats()
             
             # Calculate overall health score
             health_score = 100
@@ -147,7 +163,7 @@ class BotMonitor:
                 status_emoji = "❌"
             
             # Generate report
-            report = f"""🏥 **SYSTEM HEALTH REPORT**
+            parts = [f"""🏥 **SYSTEM HEALTH REPORT**
 
 📅 {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
 
@@ -161,23 +177,23 @@ class BotMonitor:
 • Errors: {bot_health.get('errors', 0)}
 
 🔧 **SERVICES STATUS:**
-"""
+"""]
             
             for service, is_healthy in services_health.items():
                 emoji = "✅" if is_healthy else "❌"
-                report += f"• {service}: {emoji}\n"
+                parts.append(f"• {service}: {emoji}\n")
             
             # Add system stats
             if system_stats:
                 backup_count = system_stats.get('backup', {}).get('transactions_count', 0)
                 error_count = system_stats.get('errors', {}).get('total_errors', 0)
                 
-                report += f"""
+                parts.append(f"""
 📊 **SYSTEM STATS:**
 • Backup Transactions: {backup_count}
 • Total Errors: {error_count}
 • Log Files: {len(system_stats.get('logs', {}))}
-"""
+""")
             
             # Add recommendations
             recommendations = []
@@ -191,13 +207,13 @@ class BotMonitor:
                 recommendations.append("Bot health issues detected")
             
             if recommendations:
-                report += f"""
+                parts.append("""
 💡 **RECOMMENDATIONS:**
-"""
+""")
                 for rec in recommendations:
-                    report += f"• {rec}\n"
+                    parts.append(f"• {rec}\n")
             
-            return report
+            return ''.join(parts)
             
         except Exception as e:
             self.logger.log_error(f"Error generating health report: {str(e)}")
@@ -206,10 +222,7 @@ class BotMonitor:
     def send_alert(self, message, level="warning"):
         """Send alert via WhatsApp"""
         try:
-            import requests
-            
-            fonnte_token = os.getenv('FONNTE_TOKEN')
-            if not fonnte_token:
+            if self.fonnte_headers is None:
                 return False
             
             # Add timestamp and level
@@ -217,14 +230,12 @@ class BotMonitor:
             alert_message = f"🚨 **{level.upper()} ALERT**\n\n{message}\n\n⏰ {timestamp}"
             
             # Send to admin
-            url = "https://api.fonnte.com/send"
-            headers = {'Authorization': fonnte_token}
             data = {
                 'target': self.admin_number,
                 'message': alert_message
             }
             
-            response = requests.post(url, headers=headers, data=data, timeout=10)
+            response = self.session.post(self.fonnte_url, headers=self.fonnte_headers, data=data, timeout=10)
             
             if response.status_code == 200:
                 self.logger.log_info(f"Alert sent to admin: {level}")
@@ -237,17 +248,27 @@ class BotMonitor:
             self.logger.log_error(f"Error sending alert: {str(e)}")
             return False
     
-    def check_and_alert(self):
-        """Check system and send alerts if needed"""
+    def check_and_alert(self, bot_health=None, services_health=None, error_summary=None):
+        """
+        Check system and send alerts if needed
+        
+        Args:
+            bot_health: Result of check_bot_health(), fetched if None
+            services_health: Result of check_services_health(), fetched if None
+            error_summary: Result of logger.get_error_summary(), fetched if None
+        """
         try:
             # Check bot health
-            bot_health = self.check_bot_health()
+            if bot_health is None:
+                bot_health = self.check_bot_health()
             
             # Check services
-            services_health = self.check_services_health()
+            if services_health is None:
+                services_health = self.check_services_health()
             
             # Get error summary
-            error_summary = self.logger.get_error_summary()
+            if error_summary is None:
+                error_summary = self.logger.get_error_summary()
             
             alerts = []
             
@@ -281,11 +302,19 @@ class BotMonitor:
         try:
             self.logger.log_info("🔍 Running monitoring cycle...")
             
+            # Fetch everything once per cycle, shared by alerts and the report
+            # (the bot ping overlaps with the service and stats checks)
+            bot_future = self.executor.submit(self.check_bot_health)
+            services_health = self.check_services_health()
+            system_stats = self.get_system_stats()
+            bot_health = bot_future.result()
+            error_summary = system_stats.get('errors') or self.logger.get_error_summary()
+            
             # Check and alert
-            alert_count = self.check_and_alert()
+            alert_count = self.check_and_alert(bot_health, services_health, error_summary)
             
             # Generate health report
-            health_report = self.generate_health_report()
+            health_report = self.generate_health_report(bot_health, services_health, system_stats)
             
             # Log health report
             self.logger.log_info(f"Health monitoring completed. Alerts: {alert_count}")
@@ -23,10 +23,10 @@ def check_requirements():
         'requirements.txt'
     ]
     
-    missing_files = []
-    for file in required_files:
-        if not os.path.exists(file):
-            missing_files.append(file)
+    # One directory scan instead of a stat per file
+    with os.scandir('.') as it:
+        present = {entry.name for entry in it}
+    missing_files = [file for file in required_files if file not in present]
     
     if missing_files:
         print("❌ Missing required files:")
@@ -8,8 +8,14 @@ import os
 import time
 import threading
 import schedule
-from datetime import datetime, timedelta
-from typing import Dict, Any
+import heapq
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
 # Import services
@@ -26,30 +32,51 @@ class SchedulerService:
         self.logger = LoggerService()
         self.running = False
         self.thread = None
+        self.max_idle_seconds = 300
+        
+        # Short-lived cache for Sheets reads shared between reports
+        self.cache_ttl = 60
+        self._cache = {}
+        
+        # Overlap Sheets, Gemini and Fonnte calls within a report
+        self._pool = ThreadPoolExecutor(max_workers=4)
+        self._wake = threading.Event()
         
         # Configuration
         self.admin_number = os.getenv('ADMIN', '6282181151735')
         self.bos_number = os.getenv('BOS', '628115302098')
+        self.fonnte_token = os.getenv('FONNTE_TOKEN')
+        self.fonnte_url = "https://api.fonnte.com/send"
+        
+        # Keep-alive session for Fonnte so reports reuse one TLS connection
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        self._session.headers['Authorization'] = self.fonnte_token or ''
+        self._session.headers['Content-Type'] = 'application/x-www-form-urlencoded'
         
         # Setup schedules
         self._setup_schedules()
+        self._schedule_info = [
+            {'task': 'Daily Report', 'time': '23:50', 'enabled': True},
+            {'task': 'Balance Reminder', 'time': '06:00', 'enabled': True},
+            {'task': 'System Report', 'time': '23:50', 'enabled': True},
+            {'task': 'Weekly Backup', 'time': 'Sunday 01:00', 'enabled': True},
+            {'task': 'Monthly Insights', 'time': '1st 08:00', 'enabled': True}
+        ]
     
     def _setup_schedules(self):
         """Setup scheduled tasks"""
-        # Daily report at 23:50
-        schedule.every().day.at("23:50").do(self._send_daily_report)
+        # Daily and system reports at 23:50, sharing one set of Sheets reads
+        schedule.every().day.at("23:50").do(self._end_of_day_rollup)
         
         # Morning balance reminder at 06:00
         schedule.every().day.at("06:00").do(self._send_balance_reminder)
         
-        # System performance report at 00:00
-        schedule.every().day.at("00:00").do(self._send_system_report)
-        
         # Weekly backup every Sunday at 01:00
         schedule.every().sunday.at("01:00").do(self._weekly_backup)
         
-        # Monthly insights every 1st at 08:00
-        schedule.every().month.do(self._send_monthly_insights)
+        # Monthly insights every 1st at 08:00 (schedule has no monthly trigger)
+        schedule.every().day.at("08:00").do(self._monthly_insights_if_first)
         
         print("✅ Schedules configured")
     
@@ -57,6 +84,7 @@ class SchedulerService:
         """Start the scheduler"""
         if not self.running:
             self.running = True
+            self._wake.clear()
             self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
             self.thread.start()
             self.logger.log_info("🕐 Scheduler started")
@@ -64,73 +92,125 @@ class SchedulerService:
     def stop(self):
         """Stop the scheduler"""
         self.running = False
+        self._wake.set()
         if self.thread:
             self.thread.join()
         self.logger.log_info("⏹️ Scheduler stopped")
     
     def _run_scheduler(self):
         """Run the scheduler loop"""
+        backoff = 1
         while self.running:
             try:
                 schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                backoff = 1
+                # Sleep until the next job is due instead of polling every minute
+                self._wake.wait(self._idle_seconds())
             except Exception as e:
                 self.logger.log_error(f"Scheduler error: {str(e)}")
-                time.sleep(60)
+                # Retry quickly after transient failures, backing off up to a minute
+                self._wake.wait(backoff)
+                backoff = min(backoff * 2, 60)
+    
+    def _idle_seconds(self) -> float:
+        """Seconds until the next job is due, capped at max_idle_seconds"""
+        idle = schedule.idle_seconds()
+        if idle is None:
+            return self.max_idle_seconds
+        return min(max(idle, 1), self.max_idle_seconds)
+    
+    def _cached(self, key, fn, ttl: float = None):
+        """Return fn() cached under key for ttl seconds"""
+        ttl = self.cache_ttl if ttl is None else ttl
+        value, stamp = self._cache.get(key, (None, 0))
+        now = time.time()
+        if now - stamp < ttl:
+            return value
+        value = fn()
+        self._cache[key] = (value, now)
+        return value
+    
+    def _get_balance(self) -> int:
+        """Current balance, cached briefly"""
+        return self._cached(('balance',), self.sheets.get_current_balance)
+    
+    def _get_daily(self, date: str):
+        """Transactions for date, cached briefly"""
+        return self._cached(('daily', date), lambda: self.sheets.get_daily_transactions(date))
     
     def _send_daily_report(self):
         """Send daily report to bos and admin"""
         try:
             today = datetime.now().strftime('%Y-%m-%d')
-            transactions = self.sheets.get_daily_transactions(today)
+            balance_future = self._pool.submit(self._get_balance)
+            transactions = self._get_daily(today)
+            message = self._format_daily_report(today, balance_future.result(), transactions)
             
-            if not transactions:
-                message = f"""📊 **LAPORAN HARIAN**
+            # Send to both numbers in one request
+            self._send_whatsapp_message([self.bos_number, self.admin_number], message)
+            
+            self.logger.log_info("📊 Daily report sent")
+            
+        except Exception as e:
+            self.logger.log_error(f"Error sending daily report: {str(e)}")
+    
+    def _format_daily_report(self, today: str, balance: int, transactions: List[Dict[str, Any]]) -> str:
+        """Format the daily report message"""
+        if not transactions:
+            return f"""📊 **LAPORAN HARIAN**
                 
 📅 {today}
-💰 Saldo: Rp {self.sheets.get_current_balance():,}
+💰 Saldo: Rp {balance:,}
 📝 Tidak ada transaksi hari ini
 
 🤖 Bot berjalan normal 24/7"""
-            else:
-                total_income = sum(t.get('jumlah', 0) for t in transactions if t.get('tipe') == 'IN')
-                total_expense = sum(t.get('jumlah', 0) for t in transactions if t.get('tipe') == 'OUT')
-                
-                message = f"""📊 **LAPORAN HARIAN**
+        
+        # Totals, categories and the last five rows in a single pass
+        total_income = total_expense = 0
+        categories = {}
+        latest = deque(maxlen=5)
+        for t in transactions:
+            jumlah = t.get('jumlah', 0)
+            tipe = t.get('tipe')
+            if tipe == 'IN':
+                total_income += jumlah
+            elif tipe == 'OUT':
+                total_expense += jumlah
+            cat = t.get('kategori', 'Lainnya')
+            categories[cat] = categories.get(cat, 0) + jumlah
+            latest.append(t)
+        
+        parts = [f"""📊 **LAPORAN HARIAN**
                 
 📅 {today}
-💰 Saldo: Rp {self.sheets.get_current_balance():,}
+💰 Saldo: Rp {balance:,}
 
 📈 **PEMASUKAN:** Rp {total_income:,}
 📉 **PENGELUARAN:** Rp {total_expense:,}
 📝 **TOTAL TRANSAKSI:** {len(transactions)}
 
 🔍 **TRANSAKSI TERBARU:**
-"""
-                
-                # Show last 5 transactions
-                for i, trans in enumerate(transactions[-5:], 1):
-                    emoji = "📈" if trans.get('tipe') == 'IN' else "📉"
-                    message += f"{i}. {emoji} {trans.get('deskripsi', '')} - Rp {trans.get('jumlah', 0):,}\n"
-                
-                # Add AI insights
-                insights = self.gemini.get_insights(transactions)
-                if insights:
-                    message += f"\n{insights}"
-            
-            # Send to both numbers
-            self._send_whatsapp_message(self.bos_number, message)
-            self._send_whatsapp_message(self.admin_number, message)
-            
-            self.logger.log_info("📊 Daily report sent")
-            
-        except Exception as e:
-            self.logger.log_error(f"Error sending daily report: {str(e)}")
+"""]
+        
+        # Show last 5 transactions
+        for i, trans in enumerate(latest, 1):
+            emoji = "📈" if trans.get('tipe') == 'IN' else "📉"
+            parts.append(f"{i}. {emoji} {trans.get('deskripsi', '')} - Rp {trans.get('jumlah', 0):,}\n")
+        
+        # Add AI insights from the totals computed above
+        insights = self.gemini.get_insights({
+            'total_income': total_income,
+            'total_expense': total_expense,
+            'categories': categories
+        })
+        if insights:
+            parts.append(f"\n{insights}")
+        return "".join(parts)
     
     def _send_balance_reminder(self):
         """Send morning balance reminder"""
         try:
-            current_balance = self.sheets.get_current_balance()
+            current_balance = self._get_balance()
             today = datetime.now().strftime('%d/%m/%Y')
             
             message = f"""🌅 **REMINDER SALDO PAGI**
@@ -145,9 +225,8 @@ class SchedulerService:
 
 🤖 Bos Upety Bot PRO 24/7 siap melayani!"""
             
-            # Send to both numbers
-            self._send_whatsapp_message(self.bos_number, message)
-            self._send_whatsapp_message(self.admin_number, message)
+            # Send to both numbers in one request
+            self._send_whatsapp_message([self.bos_number, self.admin_number], message)
             
             self.logger.log_info("🌅 Balance reminder sent")
             
@@ -157,26 +236,60 @@ class SchedulerService:
     def _send_system_report(self):
         """Send system performance report"""
         try:
-            # Get system stats
-            recent_transactions = self.sheets.get_recent_transactions(100)
-            total_transactions = len(recent_transactions)
+            now = datetime.now()
+            balance, daily_transactions, recent_transactions = self._fetch_report_data(now.strftime('%Y-%m-%d'))
+            message = self._format_system_report(now, balance, daily_transactions, len(recent_transactions))
             
-            # Calculate stats
-            today = datetime.now().strftime('%Y-%m-%d')
-            daily_transactions = self.sheets.get_daily_transactions(today)
+            # Send to admin only
+            self._send_whatsapp_message([self.admin_number], message)
+            
+            self.logger.log_info("🤖 System report sent")
+            
+        except Exception as e:
+            self.logger.log_error(f"Error sending system report: {str(e)}")
+    
+    def _end_of_day_rollup(self):
+        """Send the daily and system reports from a single set of Sheets reads"""
+        try:
+            now = datetime.now()
+            today = now.strftime('%Y-%m-%d')
+            balance, transactions, recent_transactions = self._fetch_report_data(today)
+            
+            daily_message = self._format_daily_report(today, balance, transactions)
+            self._send_whatsapp_message([self.bos_number, self.admin_number], daily_message)
+            self.logger.log_info("📊 Daily report sent")
             
-            # Get error count from logs
-            error_count = self._get_error_count_today()
+            system_message = self._format_system_report(now, balance, transactions, len(recent_transactions))
+            self._send_whatsapp_message([self.admin_number], system_message)
+            self.logger.log_info("🤖 System report sent")
             
-            message = f"""🤖 **LAPORAN PERFORMA SISTEM**
+        except Exception as e:
+            self.logger.log_error(f"Error sending end-of-day reports: {str(e)}")
+    
+    def _fetch_report_data(self, today: str):
+        """Fetch balance, today's and recent transactions concurrently"""
+        balance_future = self._pool.submit(self._get_balance)
+        daily_future = self._pool.submit(self._get_daily, today)
+        recent_future = self._pool.submit(
+            self._cached, ('recent', 100), lambda: self.sheets.get_recent_transactions(100)
+        )
+        return balance_future.result(), daily_future.result(), recent_future.result()
+    
+    def _format_system_report(self, now: datetime, balance: int, daily_transactions: List[Dict[str, Any]],
+                              total_transactions: int) -> str:
+        """Format the system performance report message"""
+        # Get error count from logs
+        error_count = self._get_error_count_today()
+        
+        return f"""🤖 **LAPORAN PERFORMA SISTEM**
 
-📅 {datetime.now().strftime('%d/%m/%Y %H:%M')}
+📅 {now.strftime('%d/%m/%Y %H:%M')}
 
 📊 **STATISTIK:**
 • Total Transaksi: {total_transactions}
 • Transaksi Hari Ini: {len(daily_transactions)}
 • Error Count: {error_count}
-• Saldo Terkini: Rp {self.sheets.get_current_balance():,}
+• Saldo Terkini: Rp {balance:,}
 
 🔧 **STATUS LAYANAN:**
 • Google Sheets: {'✅' if self.sheets.is_healthy() else '❌'}
@@ -184,25 +297,15 @@ class SchedulerService:
 • Scheduler: {'✅' if self.running else '❌'}
 
 🕐 **JADWAL OTOMATIS:**
-• 23:50 - Laporan Harian
+• 23:50 - Laporan Harian & Performa (ini)
 • 06:00 - Reminder Saldo
-• 00:00 - Laporan Performa (ini)
 
 🤖 Bot berjalan normal 24/7"""
-            
-            # Send to admin only
-            self._send_whatsapp_message(self.admin_number, message)
-            
-            self.logger.log_info("🤖 System report sent")
-            
-        except Exception as e:
-            self.logger.log_error(f"Error sending system report: {str(e)}")
     
     def _send_monthly_insights(self):
         """Send monthly insights and summary"""
         try:
             now = datetime.now()
-            last_month = now - timedelta(days=30)
             
             # Get monthly summary
             monthly_data = self.sheets.get_monthly_summary(now.year, now.month)
@@ -210,7 +313,7 @@ class SchedulerService:
             if not monthly_data:
                 return
             
-            message = f"""📈 **LAPORAN BULANAN**
+            parts = [f"""📈 **LAPORAN BULANAN**
 
 📅 {now.strftime('%B %Y')}
 
@@ -221,36 +324,40 @@ class SchedulerService:
 • Total Transaksi: {monthly_data.get('total_transactions', 0)}
 
 🏆 **KATEGORI TERBANYAK:**
-"""
+"""]
             
             # Show top 3 categories
             categories = monthly_data.get('categories', {})
-            sorted_categories = sorted(categories.items(), key=lambda x: x[1], reverse=True)
+            top_categories = heapq.nlargest(3, categories.items(), key=lambda x: x[1])
             
-            for i, (category, amount) in enumerate(sorted_categories[:3], 1):
-                message += f"{i}. {category}: Rp {amount:,}\n"
+            for i, (category, amount) in enumerate(top_categories, 1):
+                parts.append(f"{i}. {category}: Rp {amount:,}\n")
             
-            # Add AI insights
-            transactions = monthly_data.get('transactions', [])
-            insights = self.gemini.get_insights(transactions)
+            # Add AI insights, monthly_data already carries the aggregates
+            insights = self.gemini.get_insights(monthly_data)
             if insights:
-                message += f"\n{insights}"
+                parts.append(f"\n{insights}")
+            message = "".join(parts)
             
-            # Send to both numbers
-            self._send_whatsapp_message(self.bos_number, message)
-            self._send_whatsapp_message(self.admin_number, message)
+            # Send to both numbers in one request
+            self._send_whatsapp_message([self.bos_number, self.admin_number], message)
             
             self.logger.log_info("📈 Monthly insights sent")
             
         except Exception as e:
             self.logger.log_error(f"Error sending monthly insights: {str(e)}")
     
+    def _monthly_insights_if_first(self):
+        """Send monthly insights only on the first day of the month"""
+        if datetime.now().day == 1:
+            self._send_monthly_insights()
+    
     def _weekly_backup(self):
         """Perform weekly backup"""
         try:
             # Backup to CSV
-            backup_filename = f"weekly_backup_{datetime.now().strftime('%Y%m%d')}.csv"
-            success = self.sheets.backup_to_csv(backup_filename)
+            backup_filename = f"weekly_backup_{datetime.now().strftime('%Y%m%d')}.csv.gz"
+            success = self.sheets.backup_to_csv(backup_filename, chunk_size=1000)
             
             if success:
                 self.logger.log_info(f"📦 Weekly backup completed: {backup_filename}")
@@ -270,50 +377,71 @@ class SchedulerService:
             self.logger.log_error(f"Error getting error count: {str(e)}")
             return 0
     
-    def _send_whatsapp_message(self, phone: str, message: str) -> bool:
-        """Send WhatsApp message via Fonnte API"""
-        try:
-            import requests
-            
-            fonnte_token = os.getenv('FONNTE_TOKEN')
-            if not fonnte_token:
-                self.logger.log_error("FONNTE_TOKEN not found")
-                return False
+    def _send_whatsapp_message(self, phones: List[str], message: str) -> bool:
+        """Send WhatsApp message via Fonnte API
+        
+        Args:
+            phones: Recipient numbers, sent as one comma-separated target
+            message: Message text
             
-            url = "https://api.fonnte.com/send"
-            headers = {
-                'Authorization': fonnte_token
-            }
-            data = {
-                'target': phone,
-                'message': message
-            }
+        Returns:
+            True if Fonnte accepted the message for every recipient
+        """
+        if not self.fonnte_token:
+            self.logger.log_error("FONNTE_TOKEN not found")
+            return False
+        
+        result = self._post_fonnte(','.join(phones), message)
+        if result is not False or len(phones) < 2:
+            # Unknown outcome (timeout, 5xx) may already be delivered: don't resend
+            return bool(result)
+        
+        # Combined target rejected, fall back to one request per recipient in parallel
+        futures = [self._pool.submit(self._post_fonnte, phone, message) for phone in phones]
+        return all([future.result() for future in futures])
+    
+    def _post_fonnte(self, target: str, message: str) -> Optional[bool]:
+        """POST a single message to Fonnte
+        
+        Returns:
+            True if accepted, False if Fonnte rejected it (4xx or status false),
+            None if the outcome is unknown (transport error or 5xx)
+        """
+        try:
+            # Encode the form body once ourselves so requests sends the bytes as-is
+            body = urlencode({'target': target, 'message': message}).encode()
             
-            response = requests.post(url, headers=headers, data=data, timeout=10)
+            response = self._session.post(self.fonnte_url, data=body, timeout=10)
             
-            if response.status_code == 200:
-                self.logger.log_info(f"✅ Message sent to {phone}")
-                return True
-            else:
-                self.logger.log_error(f"❌ Failed to send message to {phone}: {response.text}")
-                return False
-                
         except Exception as e:
             self.logger.log_error(f"Error sending WhatsApp message: {str(e)}")
+            return None
+        
+        if response.status_code == 200 and self._fonnte_accepted(response):
+            self.logger.log_info(f"✅ Message sent to {target}")
+            return True
+        
+        self.logger.log_error(f"❌ Failed to send message to {target}: {response.text}")
+        if response.status_code == 200 or 400 <= response.status_code < 500:
             return False
+        return None
+    
+    def _fonnte_accepted(self, response) -> bool:
+        """Read Fonnte's status flag; a body without one counts as accepted"""
+        try:
+            return response.json().get('status', True) is not False
+        except (ValueError, AttributeError):
+            return True
     
     def get_schedule_info(self) -> Dict[str, Any]:
         """Get schedule information"""
+        next_run = self._cached(
+            ('next_run',), lambda: str(schedule.next_run()) if schedule.jobs else None, ttl=1
+        )
         return {
             'running': self.running,
-            'schedules': [
-                {'task': 'Daily Report', 'time': '23:50', 'enabled': True},
-                {'task': 'Balance Reminder', 'time': '06:00', 'enabled': True},
-                {'task': 'System Report', 'time': '00:00', 'enabled': True},
-                {'task': 'Weekly Backup', 'time': 'Sunday 01:00', 'enabled': True},
-                {'task': 'Monthly Insights', 'time': '1st 08:00', 'enabled': True}
-            ],
-            'next_run': str(schedule.next_run()) if schedule.jobs else None
+            'schedules': self._schedule_info,
+            'next_run': next_run
         }
     
     def run_manual_task(self, task_name: str) -> bool:
@@ -6,6 +6,7 @@ Script untuk setup awal Google Sheets dengan format yang benar
 """
 
 import os
+import functools
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime
@@ -13,25 +14,28 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+_SCOPE = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """Authorize gspread once and reuse the client"""
+    creds = Credentials.from_service_account_file('credentials.json', scopes=_SCOPE)
+    return gspread.authorize(creds)
+
 def setup_google_sheets():
     """Setup Google Sheets dengan format yang benar"""
     try:
         print("🔧 Setting up Google Sheets...")
         
-        # Setup credentials
-        scope = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        if os.path.exists('credentials.json'):
-            creds = Credentials.from_service_account_file('credentials.json', scopes=scope)
-        else:
+        if not os.path.exists('credentials.json'):
             print("❌ credentials.json not found!")
             return False
         
         # Initialize client
-        client = gspread.authorize(creds)
+        client = _get_client()
         
         # Get sheet ID from environment
         sheet_id = os.getenv('SHEET_ID')
@@ -50,16 +54,6 @@ def setup_google_sheets():
         
         # Setup headers
         headers = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori', 'Saldo', 'Bukti', 'Private']
-        worksheet.append_row(headers)
-        
-        # Format headers
-        worksheet.format('A1:H1', {
-            'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.8},
-            'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
-        })
-        
-        # Set column widths
-        worksheet.columns_auto_resize(0, 7)
         
         # Add sample data
         sample_data = [
@@ -75,13 +69,26 @@ def setup_google_sheets():
             ]
         ]
         
-        for row in sample_data:
-            worksheet.append_row(row)
+        # Write headers and sample rows in one request
+        worksheet.update(range_name=f'A1:H{len(sample_data) + 1}', values=[headers] + sample_data)
+        
+        # Format headers and sample row in one request
+        worksheet.batch_format([
+            {
+                'range': 'A1:H1',
+                'format': {
+                    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.8},
+                    'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
+                }
+            },
+            {
+                'range': 'A2:H2',
+                'format': {'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}}
+            }
+        ])
         
-        # Format sample row
-        worksheet.format('A2:H2', {
-            'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
-        })
+        # Set column widths
+        worksheet.columns_auto_resize(0, 7)
         
         print("✅ Headers and formatting applied")
         print("✅ Sample data added")
@@ -98,7 +105,7 @@ def setup_google_sheets():
             # Setup summary headers
             summary_headers = ['Tanggal', 'Total Pemasukan', 'Total Pengeluaran', 'Saldo Bersih', 'Jumlah Transaksi']
             summary_sheet.clear()
-            summary_sheet.append_row(summary_headers)
+            summary_sheet.update(range_name='A1:E1', values=[summary_headers])
             
             # Format summary headers
             summary_sheet.format('A1:E1', {
@@ -125,20 +132,12 @@ def create_new_sheet():
     try:
         print("📝 Creating new Google Sheet...")
         
-        # Setup credentials
-        scope = [
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        if os.path.exists('credentials.json'):
-            creds = Credentials.from_service_account_file('credentials.json', scopes=scope)
-        else:
+        if not os.path.exists('credentials.json'):
             print("❌ credentials.json not found!")
             return None
         
         # Initialize client
-        client = gspread.authorize(creds)
+        client = _get_client()
         
         # Create new spreadsheet
         spreadsheet = client.create('Bos Upety Bot - Keuangan')
@@ -155,7 +154,7 @@ def create_new_sheet():
         
         # Setup headers
         headers = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori', 'Saldo', 'Bukti', 'Private']
-        worksheet.append_row(headers)
+        worksheet.update(range_name='A1:H1', values=[headers])
         
         # Format headers
         worksheet.format('A1:H1', {
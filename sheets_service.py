@@ -5,16 +5,66 @@ Google Sheets Service - Integrasi Google Sheets untuk menyimpan transaksi
 """
 
 import os
+import csv
+import gzip
 import json
 import time
+import queue
+import random
+import atexit
+import threading
+from collections import deque
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import gspread
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
 from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
+class _RateLimiter:
+    """Sliding-window limiter: at most max_calls per period seconds"""
+    
+    def __init__(self, max_calls: int, period: float):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until another call fits in the window"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+# Sheets quota is per service account, so every SheetsService in the
+# process shares one budget: 90 requests / 100 s and 8 in flight
+_sheets_rate = _RateLimiter(90, 100)
+_sheets_slots = threading.BoundedSemaphore(8)
+
+# Guards the pending file shared by every SheetsService in the process
+_pending_lock = threading.Lock()
+
+EXPECTED_HEADERS = ('Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori', 'Saldo', 'Bukti', 'Private')
+
+_HEADER_FORMAT = {
+    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.8},
+    'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
+}
+
 class SheetsService:
     def __init__(self):
         self.sheet_id = os.getenv('SHEET_ID')
@@ -22,8 +72,38 @@ class SheetsService:
         self.worksheet = None
         self.client = None
         
+        # Short-lived copy of get_all_records() shared by the read methods
+        self._records_cache = None
+        self._records_cache_ts = 0
+        self._cache_ttl = 30
+        self._cache_max_age = 60  # Older than this is refetched before returning
+        self._refresh_lock = threading.Lock()
+        self._balance = None  # Saldo of the last row, see get_current_balance
+        self._balance_ts = 0
+        self._last_row = None  # Last data row number, when known
+        
+        # Background writer settings
+        self.max_batch_size = 20  # Rows appended per request
+        self.flush_interval = 2  # Seconds to wait for more rows before appending
+        self.max_write_attempts = 6
+        self.format_refresh_interval = 3600  # Seconds between column auto-resizes
+        self._format_timer = None
+        self._write_q = queue.SimpleQueue()
+        self._closing = threading.Event()  # Set by close(): stop retrying, park failed rows
+        self._unsent = 0  # Rows saved but not yet appended or parked
+        self._unsent_lock = threading.Lock()
+        self._retrying = False  # Writer is backing off after a failed append
+        
+        # Rows that could not be appended wait here until the next successful write
+        self.pending_file = os.path.join("backups", "pending_sheets.jsonl")
+        
         # Initialize Google Sheets connection
         self._initialize_connection()
+        
+        # Start background writer thread
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
     
     def _initialize_connection(self):
         """Initialize Google Sheets connection"""
@@ -41,7 +121,8 @@ class SheetsService:
                 # Fallback: try environment variable
                 creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
                 if creds_json:
-                    creds = Credentials.from_service_account_info(json.loads(creds_json), scopes=scope)
+                    info = orjson.loads(creds_json) if orjson else json.loads(creds_json)
+                    creds = Credentials.from_service_account_info(info, scopes=scope)
                 else:
                     raise Exception("No credentials found")
             
@@ -52,12 +133,19 @@ class SheetsService:
             if self.sheet_id:
                 spreadsheet = self.client.open_by_key(self.sheet_id)
                 self.worksheet = spreadsheet.sheet1
+                self._records_cache = None
+                self._balance = None
+                self._last_row = None
                 
                 # Setup headers if not exists
                 self._setup_headers()
                 
                 self.health_status = True
                 print("✅ Google Sheets connected successfully")
+                
+                # Wake the writer so rows left from an earlier failure go out
+                if os.path.exists(self.pending_file):
+                    self._write_q.put(threading.Event())
             else:
                 raise Exception("SHEET_ID not found in environment")
                 
@@ -72,34 +160,105 @@ class SheetsService:
                 return
             
             # Check if headers exist
-            headers = self.worksheet.row_values(1)
-            expected_headers = ['Tanggal', 'Deskripsi', 'Jumlah', 'Tipe', 'Kategori', 'Saldo', 'Bukti', 'Private']
-            
-            if not headers or headers != expected_headers:
-                # Clear first row and add headers
-                self.worksheet.clear()
-                self.worksheet.append_row(expected_headers)
-                
-                # Format headers
-                self.worksheet.format('A1:H1', {
-                    'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 0.8},
-                    'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
-                })
+            values = self.worksheet.get('A1:H1')
+            headers = tuple(values[0]) if values else ()
+            
+            if headers != EXPECTED_HEADERS:
+                # Clear values, write + format headers and resize in one request
+                sheet_id = self.worksheet.id
+                self.worksheet.spreadsheet.batch_update({'requests': [
+                    {'updateCells': {'range': {'sheetId': sheet_id}, 'fields': 'userEnteredValue'}},
+                    {'updateCells': {
+                        'range': {'sheetId': sheet_id, 'startRowIndex': 0, 'endRowIndex': 1,
+                                  'startColumnIndex': 0, 'endColumnIndex': len(EXPECTED_HEADERS)},
+                        'rows': [{'values': [
+                            {'userEnteredValue': {'stringValue': h}, 'userEnteredFormat': _HEADER_FORMAT}
+                            for h in EXPECTED_HEADERS
+                        ]}],
+                        'fields': 'userEnteredValue,userEnteredFormat(backgroundColor,textFormat)'
+                    }},
+                    {'autoResizeDimensions': {'dimensions': {
+                        'sheetId': sheet_id, 'dimension': 'COLUMNS', 'startIndex': 0, 'endIndex': 7
+                    }}}
+                ]})
                 
                 print("✅ Headers setup completed")
+            else:
+                # Auto-resize columns once per connection instead of on every save
+                self.worksheet.columns_auto_resize(0, 7)
                 
         except Exception as e:
             print(f"Error setting up headers: {str(e)}")
     
+    def _api(self, fn, *args, **kwargs):
+        """Call a Sheets API method within the shared rate and concurrency limits"""
+        with _sheets_slots:
+            _sheets_rate.acquire()
+            return fn(*args, **kwargs)
+    
+    def _get_records_cached(self) -> List[Dict[str, Any]]:
+        """
+        Return all records, refetching at most once per cache TTL
+        
+        A copy between the TTL and the max age is returned immediately and
+        refreshed in the background; anything older (or no copy at all) is
+        refetched before returning, so idle instances never serve old data.
+        """
+        records = self._records_cache
+        age = time.time() - self._records_cache_ts
+        if records is None or age >= self._cache_max_age:
+            return self._refresh_records()
+        if age >= self._cache_ttl:
+            self._refresh_records_async()
+        return records
+    
+    def _refresh_records(self) -> List[Dict[str, Any]]:
+        """Fetch all records into the cache"""
+        # Send queued rows first so the fresh copy includes them
+        self._flush_before_read()
+        records = self._api(self.worksheet.get_all_records)
+        self._records_cache = records
+        self._records_cache_ts = time.time()
+        self._last_row = len(records) + 1
+        # Pick up rows written by other instances or edited by hand
+        if not self._unsent:
+            self._set_balance(records[-1].get('Saldo', 0) if records else 0)
+        return records
+    
+    def _refresh_records_async(self):
+        """Refresh the records cache on a background thread, one at a time"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        
+        def refresh():
+            try:
+                self._refresh_records()
+            except Exception as e:
+                print(f"Error refreshing records: {str(e)}")
+            finally:
+                self._refresh_lock.release()
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def _cache_appended_row(self, row_data: List[Any]):
+        """Keep the records cache in step with a row we just appended"""
+        if not self._records_cache:
+            self._records_cache = None
+            return
+        self._records_cache.append(dict(zip(self._records_cache[0].keys(), row_data)))
+    
     def save_transaction(self, transaction_data: Dict[str, Any]) -> bool:
         """
         Simpan transaksi ke Google Sheets
         
+        Baris dimasukkan ke antrian dan ditulis oleh writer thread dalam
+        batch, jadi beberapa transaksi berdekatan cukup satu request.
+        
         Args:
             transaction_data: Data transaksi
             
         Returns:
-            bool: True jika berhasil, False jika gagal
+            bool: True jika berhasil masuk antrian, False jika gagal
         """
         try:
             if not self.worksheet:
@@ -107,48 +266,227 @@ class SheetsService:
                 if not self.worksheet:
                     return False
             
-            # Retry mechanism
-            for attempt in range(3):
+            # Prepare row data
+            row_data = [
+                transaction_data.get('tanggal', ''),
+                transaction_data.get('deskripsi', ''),
+                transaction_data.get('jumlah', 0),
+                transaction_data.get('tipe', 'INFO'),
+                transaction_data.get('kategori', 'Lainnya'),
+                transaction_data.get('saldo', 0),
+                transaction_data.get('bukti', ''),
+                transaction_data.get('private', 'No')
+            ]
+            
+            if self._format_timer is None:
+                self._schedule_format_refresh()
+            
+            self._cache_appended_row(row_data)
+            self._set_balance(row_data[5])
+            with self._unsent_lock:
+                self._unsent += 1
+            self._write_q.put(row_data)
+            return True
+            
+        except Exception as e:
+            self.health_status = False
+            print(f"❌ Error saving transaction: {str(e)}")
+            return False
+    
+    def _writer_loop(self):
+        """
+        Drain the write queue and append rows to the sheet in batches
+        
+        Queue items are row lists, a threading.Event to signal once
+        everything queued before it has been sent, or None to stop.
+        """
+        while True:
+            item = self._write_q.get()
+            batch = []
+            waiters = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                
+                if stop or waiters or len(batch) >= self.max_batch_size:
+                    break
                 try:
-                    # Prepare row data
-                    row_data = [
-                        transaction_data.get('tanggal', ''),
-                        transaction_data.get('deskripsi', ''),
-                        transaction_data.get('jumlah', 0),
-                        transaction_data.get('tipe', 'INFO'),
-                        transaction_data.get('kategori', 'Lainnya'),
-                        transaction_data.get('saldo', 0),
-                        transaction_data.get('bukti', ''),
-                        transaction_data.get('private', 'No')
-                    ]
-                    
-                    # Append row
-                    self.worksheet.append_row(row_data)
-                    
-                    # Auto-resize columns
-                    self.worksheet.columns_auto_resize(0, 7)
-                    
+                    item = self._write_q.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            
+            if batch or os.path.exists(self.pending_file):
+                self._append_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+    
+    def _append_batch(self, batch: List[List[Any]]):
+        """
+        Append a batch of rows in one request, retrying on failure
+        
+        Rows parked by an earlier failed append go in front of the batch, in
+        the same request, so the sheet keeps them in order and its last row
+        still carries the latest saldo.
+        """
+        own = len(batch)  # Rows from this instance's queue, see _unsent
+        pending = self._claim_pending()
+        if pending:
+            print(f"🔄 Retrying {len(pending)} pending transaction(s)")
+            batch = pending + batch
+            self._records_cache = None  # Cached order is off now; refetch on next read
+        if not batch:
+            return
+        
+        try:
+            for attempt in range(self.max_write_attempts):
+                try:
+                    # Values are already normalized, skip server-side parsing
+                    response = self._api(self.worksheet.append_rows, batch, value_input_option='RAW')
+                    updated_range = (response or {}).get('updates', {}).get('updatedRange')
+                    if updated_range:
+                        self._last_row = a1_to_rowcol(updated_range.split('!')[-1].split(':')[-1])[0]
                     self.health_status = True
-                    print(f"✅ Transaction saved to Sheets: {transaction_data.get('deskripsi', '')}")
-                    return True
+                    print(f"✅ {len(batch)} transaction(s) saved to Sheets")
+                    return
                     
                 except Exception as e:
-                    if attempt == 2:  # Last attempt
+                    if attempt == self.max_write_attempts - 1 or self._closing.is_set():  # Last attempt
                         self.health_status = False
-                        raise e
-                    time.sleep(1)  # Wait before retry
-                    
+                        print(f"❌ Error saving {len(batch)} transaction(s): {str(e)}")
+                        self._park_failed_rows(batch)
+                        return
+                    self._retrying = True
+                    self._closing.wait(self._retry_delay(e, attempt))
+        finally:
+            self._retrying = False
+            with self._unsent_lock:
+                self._unsent -= own
+    
+    def _park_failed_rows(self, batch: List[List[Any]]):
+        """Keep rows that could not be appended in the pending file and out of the cache"""
+        try:
+            with _pending_lock:
+                os.makedirs(os.path.dirname(self.pending_file), exist_ok=True)
+                with open(self.pending_file, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in batch)
+            print(f"⚠️ {len(batch)} transaction(s) kept in {self.pending_file} for retry")
         except Exception as e:
-            self.health_status = False
-            print(f"❌ Error saving transaction: {str(e)}")
-            return False
+            print(f"❌ Error keeping failed transactions: {str(e)}")
+        
+        # The sheet doesn't have these rows, so cached reads shouldn't either
+        records = self._records_cache
+        if records:
+            for row in batch:
+                for i in range(len(records) - 1, -1, -1):
+                    if list(records[i].values()) == row:
+                        del records[i]
+                        break
+        self._balance = None
     
-    def get_daily_transactions(self, date: str) -> List[Dict[str, Any]]:
+    def _claim_pending(self) -> List[List[Any]]:
+        """
+        Take every row parked in the pending file
+        
+        The file is shared with other instances and processes (monitor,
+        maintenance), so it is first renamed to a name only this process
+        uses; rows parked after the rename start a new pending file.
+        """
+        claimed = f"{self.pending_file}.{os.getpid()}.replaying"
+        try:
+            with _pending_lock:
+                try:
+                    os.replace(self.pending_file, claimed)
+                except FileNotFoundError:
+                    return []
+                with open(claimed, 'r', encoding='utf-8') as f:
+                    rows = [json.loads(line) for line in f if line.strip()]
+                os.remove(claimed)
+            return rows
+        except Exception as e:
+            print(f"Error reading pending transactions: {str(e)}")
+            return []
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retrying, honouring Retry-After on quota errors"""
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 60)
+            except ValueError:
+                pass
+        # Exponential backoff with full jitter: 1s, 2s, 4s ... capped at 60s
+        return random.uniform(0, min(2 ** attempt, 60)) + 0.5
+    
+    def _schedule_format_refresh(self):
+        """Arm the timer for the next periodic format refresh"""
+        self._format_timer = threading.Timer(self.format_refresh_interval, self._periodic_format_refresh)
+        self._format_timer.daemon = True
+        self._format_timer.start()
+    
+    def _periodic_format_refresh(self):
+        """Auto-resize columns and reapply header format, off the save path"""
+        try:
+            if self.worksheet:
+                self._api(self.worksheet.columns_auto_resize, 0, 7)
+                self._api(self.worksheet.format, 'A1:H1', _HEADER_FORMAT)
+        except Exception as e:
+            print(f"Error refreshing sheet format: {str(e)}")
+        finally:
+            self._schedule_format_refresh()
+    
+    def _flush_before_read(self, timeout: float = 10):
+        """
+        Let rows saved by this instance reach the sheet before a read
+        
+        Skipped when nothing is unsent, and abandoned as soon as the writer
+        starts backing off, so reads never wait out a Sheets outage.
+        """
+        if not self._unsent or self._retrying or not self._writer_thread.is_alive():
+            return
+        done = threading.Event()
+        self._write_q.put(done)
+        deadline = time.monotonic() + timeout
+        while not done.wait(0.1):
+            if self._retrying or time.monotonic() >= deadline:
+                return
+    
+    def flush(self, timeout: float = 10):
+        """Wait until every queued transaction has been sent to Sheets"""
+        if not self._writer_thread.is_alive():
+            return
+        done = threading.Event()
+        self._write_q.put(done)
+        done.wait(timeout)
+    
+    def close(self):
+        """
+        Send any queued transactions and stop the writer thread
+        
+        Failed appends are not retried once closing; their rows go to the
+        pending file instead, so this returns after at most one more request.
+        """
+        if self._writer_thread.is_alive():
+            self._closing.set()
+            self._write_q.put(None)
+            self._writer_thread.join()
+    
+    def get_daily_transactions(self, date: str, tail: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Ambil transaksi harian
         
         Args:
             date: Tanggal dalam format YYYY-MM-DD
+            tail: Hanya ambil N transaksi terakhir hari itu (optional)
             
         Returns:
             List transaksi harian
@@ -158,29 +496,41 @@ class SheetsService:
                 return []
             
             # Get all records
-            records = self.worksheet.get_all_records()
+            records = self._get_records_cached()
+            
+            # Rows are appended in order, so the last N can be found from the end
+            if tail is not None:
+                daily_transactions = []
+                for record in reversed(records):
+                    if len(daily_transactions) >= tail:
+                        break
+                    if record.get('Tanggal', '').startswith(date):
+                        daily_transactions.append(self._record_to_transaction(record))
+                daily_transactions.reverse()
+                return daily_transactions
             
             # Filter by date
-            daily_transactions = []
-            for record in records:
-                if record.get('Tanggal', '').startswith(date):
-                    daily_transactions.append({
-                        'tanggal': record.get('Tanggal', ''),
-                        'deskripsi': record.get('Deskripsi', ''),
-                        'jumlah': int(record.get('Jumlah', 0)),
-                        'tipe': record.get('Tipe', 'INFO'),
-                        'kategori': record.get('Kategori', 'Lainnya'),
-                        'saldo': int(record.get('Saldo', 0)),
-                        'bukti': record.get('Bukti', ''),
-                        'private': record.get('Private', 'No')
-                    })
-            
-            return daily_transactions
+            to_transaction = self._record_to_transaction
+            return [to_transaction(record) for record in records
+                    if record.get('Tanggal', '').startswith(date)]
             
         except Exception as e:
             print(f"Error getting daily transactions: {str(e)}")
             return []
     
+    def _record_to_transaction(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a sheet record to the standard transaction dict"""
+        return {
+            'tanggal': record.get('Tanggal', ''),
+            'deskripsi': record.get('Deskripsi', ''),
+            'jumlah': int(record.get('Jumlah', 0)),
+            'tipe': record.get('Tipe', 'INFO'),
+            'kategori': record.get('Kategori', 'Lainnya'),
+            'saldo': int(record.get('Saldo', 0)),
+            'bukti': record.get('Bukti', ''),
+            'private': record.get('Private', 'No')
+        }
+    
     def get_current_balance(self) -> int:
         """
         Ambil saldo terbaru dari transaksi terakhir
@@ -192,20 +542,29 @@ class SheetsService:
             if not self.worksheet:
                 return 0
             
-            # Get all records
-            records = self.worksheet.get_all_records()
-            
-            if records:
-                # Get last transaction's balance
-                last_record = records[-1]
-                return int(last_record.get('Saldo', 0))
+            # Kept up to date by save_transaction and record refreshes;
+            # reread when nothing has touched it within the cache max age
+            if self._balance is None or time.time() - self._balance_ts >= self._cache_max_age:
+                # Read just the Saldo column instead of the whole sheet
+                self._flush_before_read()
+                saldo = self._api(self.worksheet.col_values, 6, value_render_option='UNFORMATTED_VALUE')
+                self._last_row = len(saldo)
+                self._set_balance((saldo[-1] or 0) if len(saldo) > 1 else 0)
             
-            return 0
+            return self._balance if self._balance is not None else 0
             
         except Exception as e:
             print(f"Error getting current balance: {str(e)}")
             return 0
     
+    def _set_balance(self, saldo: Any):
+        """Remember the latest saldo and when it was seen"""
+        try:
+            self._balance = int(saldo)
+            self._balance_ts = time.time()
+        except (TypeError, ValueError):
+            self._balance = None
+    
     def get_monthly_summary(self, year: int, month: int) -> Dict[str, Any]:
         """
         Ambil ringkasan bulanan
@@ -222,30 +581,27 @@ class SheetsService:
                 return {}
             
             # Get all records
-            records = self.worksheet.get_all_records()
+            records = self._get_records_cached()
             
-            # Filter by month/year
+            # Filter by month/year and aggregate in a single pass; dates are
+            # stored as 'YYYY-MM-DD HH:MM:SS' so a prefix match is enough
+            prefix = f"{year:04d}-{month:02d}-"
             monthly_transactions = []
+            total_income = total_expense = 0
+            categories = {}
             for record in records:
                 tanggal = record.get('Tanggal', '')
-                if tanggal:
-                    try:
-                        record_date = datetime.strptime(tanggal.split()[0], '%Y-%m-%d')
-                        if record_date.year == year and record_date.month == month:
-                            monthly_transactions.append(record)
-                    except:
-                        continue
-            
-            # Calculate summary
-            total_income = sum(int(t.get('Jumlah', 0)) for t in monthly_transactions if t.get('Tipe') == 'IN')
-            total_expense = sum(int(t.get('Jumlah', 0)) for t in monthly_transactions if t.get('Tipe') == 'OUT')
-            
-            # Category breakdown
-            categories = {}
-            for t in monthly_transactions:
-                cat = t.get('Kategori', 'Lainnya')
-                amount = int(t.get('Jumlah', 0))
-                if t.get('Tipe') == 'OUT':  # Only count expenses for categories
+                if not isinstance(tanggal, str) or not tanggal.startswith(prefix):
+                    continue
+                monthly_transactions.append(record)
+                
+                tipe = record.get('Tipe')
+                if tipe == 'IN':
+                    total_income += int(record.get('Jumlah', 0))
+                elif tipe == 'OUT':  # Only count expenses for categories
+                    amount = int(record.get('Jumlah', 0))
+                    total_expense += amount
+                    cat = record.get('Kategori', 'Lainnya')
                     categories[cat] = categories.get(cat, 0) + amount
             
             return {
@@ -275,38 +631,36 @@ class SheetsService:
             if not self.worksheet:
                 return []
             
+            # Cold cache but known sheet length: read only the last rows
+            if self._records_cache is None and self._last_row:
+                self._flush_before_read()
+                last = self._last_row
+                if last < 2:
+                    return []
+                rows = self._api(self.worksheet.get, f'A{max(2, last - limit + 1)}:H{last}',
+                                 value_render_option='UNFORMATTED_VALUE')
+                return [self._record_to_transaction(dict(zip(EXPECTED_HEADERS, row))) for row in rows if row]
+            
             # Get all records
-            records = self.worksheet.get_all_records()
+            records = self._get_records_cached()
             
             # Get last N records
             recent = records[-limit:] if len(records) > limit else records
             
             # Convert to standard format
-            recent_transactions = []
-            for record in recent:
-                recent_transactions.append({
-                    'tanggal': record.get('Tanggal', ''),
-                    'deskripsi': record.get('Deskripsi', ''),
-                    'jumlah': int(record.get('Jumlah', 0)),
-                    'tipe': record.get('Tipe', 'INFO'),
-                    'kategori': record.get('Kategori', 'Lainnya'),
-                    'saldo': int(record.get('Saldo', 0)),
-                    'bukti': record.get('Bukti', ''),
-                    'private': record.get('Private', 'No')
-                })
-            
-            return recent_transactions
+            return [self._record_to_transaction(record) for record in recent]
             
         except Exception as e:
             print(f"Error getting recent transactions: {str(e)}")
             return []
     
-    def backup_to_csv(self, filename: str = None) -> bool:
+    def backup_to_csv(self, filename: str = None, chunk_size: int = 1000) -> bool:
         """
         Backup data ke CSV
         
         Args:
-            filename: Nama file CSV (optional)
+            filename: Nama file CSV (optional), akhiran .gz untuk kompresi gzip
+            chunk_size: Jumlah baris per request jika export CSV gagal
             
         Returns:
             bool: True jika berhasil
@@ -318,17 +672,14 @@ class SheetsService:
             if not filename:
                 filename = f"backup_transactions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             
-            # Get all records
-            records = self.worksheet.get_all_records()
-            
-            # Write to CSV
-            import csv
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                if records:
-                    fieldnames = records[0].keys()
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(records)
+            # Let Google render the CSV and stream it straight to disk
+            try:
+                with self._open_backup_file(filename, 'wb') as f:
+                    self._export_csv(f)
+            except Exception as e:
+                print(f"⚠️ CSV export failed, reading ranges instead: {str(e)}")
+                with self._open_backup_file(filename, 'wt') as f:
+                    self._write_csv_chunks(f, chunk_size)
             
             print(f"✅ Backup saved to {filename}")
             return True
@@ -337,6 +688,40 @@ class SheetsService:
             print(f"Error backing up to CSV: {str(e)}")
             return False
     
+    def _open_backup_file(self, filename: str, mode: str):
+        """Open a backup file, gzip-compressed when the name ends in .gz"""
+        text_args = {'newline': '', 'encoding': 'utf-8'} if 't' in mode else {}
+        if filename.endswith('.gz'):
+            # Level 1 is fast and still shrinks repetitive CSV several times
+            return gzip.open(filename, mode, compresslevel=1, **text_args)
+        return open(filename, mode.replace('t', ''), **text_args)
+    
+    def _export_csv(self, out):
+        """Stream the worksheet's CSV export into a binary file object"""
+        url = f"https://docs.google.com/spreadsheets/d/{self.sheet_id}/export?format=csv&gid={self.worksheet.id}"
+        with self._api(self.client.session.get, url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                out.write(chunk)
+    
+    def _write_csv_chunks(self, csvfile, chunk_size: int):
+        """Write the worksheet as CSV using chunk_size-row range reads"""
+        headers = self.worksheet.row_values(1)
+        last_col = rowcol_to_a1(1, max(len(headers), 1)).rstrip('0123456789')
+        writer = csv.writer(csvfile)
+        width = len(headers)
+        wrote_header = False
+        total_rows = self.worksheet.row_count if headers else 0
+        for start in range(2, total_rows + 1, chunk_size):
+            end = min(start + chunk_size - 1, total_rows)
+            rows = self._api(self.worksheet.get, f'A{start}:{last_col}{end}')
+            if not rows:
+                continue
+            if not wrote_header:
+                writer.writerow(headers)
+                wrote_header = True
+            writer.writerows(row + [''] * (width - len(row)) for row in rows)
+    
     def is_healthy(self) -> bool:
         """Check if service is healthy"""
         return self.health_status
@@ -7,13 +7,41 @@ Script untuk testing semua fitur bot
 
 import os
 import json
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 # Load environment
 load_dotenv()
 
+# Shared keep-alive session for Fonnte calls
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=frozenset(['GET', 'POST']))  # Fonnte sends are POSTs
+))
+
+# Service instances shared across tests so each one connects only once
+_instances = {}
+_service_locks = {}
+_service_locks_guard = threading.Lock()
+
+def _shared(service_class):
+    """Return the shared instance of service_class, creating it on first use"""
+    with _service_locks_guard:
+        lock = _service_locks.setdefault(service_class, threading.Lock())
+    # Per-class lock so slow connects don't hold up the other services
+    with lock:
+        if service_class not in _instances:
+            _instances[service_class] = service_class()
+        return _instances[service_class]
+
 def test_environment():
     """Test environment variables"""
     print("🔍 Testing Environment Variables...")
@@ -44,7 +72,7 @@ def test_gemini_service():
     try:
         from gemini_service import GeminiService
         
-        gemini = GeminiService()
+        gemini = _shared(GeminiService)
         
         # Test simple transaction
         test_message = "beli rokok 25000"
@@ -70,7 +98,7 @@ def test_sheets_service():
     try:
         from sheets_service import SheetsService
         
-        sheets = SheetsService()
+        sheets = _shared(SheetsService)
         
         if sheets.is_healthy():
             print("✅ Google Sheets connected")
@@ -95,7 +123,7 @@ def test_drive_service():
     try:
         from drive_service import DriveService
         
-        drive = DriveService()
+        drive = _shared(DriveService)
         
         if drive.is_healthy():
             print("✅ Google Drive connected")
@@ -122,7 +150,7 @@ def test_logger_service():
     try:
         from logger_service import LoggerService
         
-        logger = LoggerService()
+        logger = _shared(LoggerService)
         
         # Test logging
         logger.log_info("Test info message")
@@ -149,7 +177,7 @@ def test_backup_service():
     try:
         from backup_service import BackupService
         
-        backup = BackupService()
+        backup = _shared(BackupService)
         
         # Test backup info
         info = backup.get_backup_info()
@@ -169,8 +197,6 @@ def test_whatsapp_send():
     print("\n📱 Testing WhatsApp Send...")
     
     try:
-        import requests
-        
         fonnte_token = os.getenv('FONNTE_TOKEN')
         admin_number = os.getenv('ADMIN')
         
@@ -188,7 +214,7 @@ def test_whatsapp_send():
             'message': test_message
         }
         
-        response = requests.post(url, headers=headers, data=data, timeout=10)
+        response = _session.post(url, headers=headers, data=data, timeout=10)
         
         if response.status_code == 200:
             print("✅ WhatsApp send working")
@@ -212,9 +238,9 @@ def test_full_transaction():
         from sheets_service import SheetsService
         from backup_service import BackupService
         
-        gemini = GeminiService()
-        sheets = SheetsService()
-        backup = BackupService()
+        gemini = _shared(GeminiService)
+        sheets = _shared(SheetsService)
+        backup = _shared(BackupService)
         
         # Test transaction
         test_message = "test transaksi 10000"
@@ -269,7 +295,6 @@ def main():
     print("=" * 60)
     
     tests = [
-        ("Environment Variables", test_environment),
         ("Gemini AI Service", test_gemini_service),
         ("Google Sheets Service", test_sheets_service),
         ("Google Drive Service", test_drive_service),
@@ -279,17 +304,19 @@ def main():
         ("Full Transaction Flow", test_full_transaction)
     ]
     
-    results = []
-    
-    for test_name, test_func in tests:
+    def run_test(test_name, test_func):
         try:
-            result = test_func()
-            results.append((test_name, result))
+            return test_func()
         except Exception as e:
             print(f"❌ {test_name} crashed: {str(e)}")
-            results.append((test_name, False))
-        
-        time.sleep(1)  # Small delay between tests
+            return False
+    
+    # Environment check first, the service tests are independent and I/O bound
+    results = [("Environment Variables", run_test("Environment Variables", test_environment))]
+    
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = [(test_name, executor.submit(run_test, test_name, test_func)) for test_name, test_func in tests]
+        results.extend((test_name, future.result()) for test_name, future in futures)
     
     # Summary
     print("\n" + "=" * 60)